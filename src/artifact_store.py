@@ -0,0 +1,208 @@
+#Importing required dependencies
+import os, sys
+import shutil
+import hashlib
+#=======================================================
+from src.logger import logging
+from src.exception import APSException
+from src.entity.config_entity import ARTIFACT_STORE_DIR_NAME, DEDUPLICATE_ARTIFACTS
+
+
+class ArtifactStore:
+    """
+    DESCRIPTION:
+    Content-addressed store of the pipeline artifacts: every distinct
+    content is kept once, under its sha256 digest, and the artifact files
+    of the runs are hardlinks to it. A stored content is never modified:
+    artifacts are replaced by renaming, never written in place, and must
+    not be opened as writable memory maps. Once no run links a content
+    anymore, i.e. its link count is 1, prune removes it.
+    """
+
+    def __init__(self,
+                 store_dir = ARTIFACT_STORE_DIR_NAME,
+                 enabled = DEDUPLICATE_ARTIFACTS,
+                 block_size = 1 << 20):
+        try:
+            #The directory keeping one copy of every artifact content is created on the first save
+            self.store_dir = store_dir
+            self.enabled = enabled
+            self.block_size = block_size
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def prune(self) -> int:
+        """
+        DESCRIPTION:
+        Remove the stored contents that no artifact links anymore, i.e.
+        whose only link is the store's own, e.g. after old artifact
+        directories were deleted, so that deleting them frees disk.
+        ================================================================
+        RETURN:
+        int: The number of bytes freed.
+        """
+        try:
+            if not os.path.isdir(self.store_dir):
+                return 0
+            n_freed_bytes, n_removed = 0, 0
+            for dir_path, _, file_names in os.walk(self.store_dir):
+                for file_name in file_names:
+                    if file_name.endswith(".tmp"):
+                        continue
+                    content_path = os.path.join(dir_path, file_name)
+                    stat = os.stat(content_path)
+                    if stat.st_nlink == 1:
+                        os.remove(content_path)
+                        n_freed_bytes += stat.st_size
+                        n_removed += 1
+            logging.info(f"Pruned {n_removed} unreferenced contents of the artifact store, {n_freed_bytes} bytes freed.")
+            return n_freed_bytes
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_content_path(self, digest: str) -> str:
+        """
+        DESCRIPTION:
+        Return the path under which the content with the given sha256
+        digest is kept. The first two characters of the digest are
+        used as sub directory to keep the directories small.
+        ==============================================================
+        RETURN:
+        str: The path of the content in the artifact store.
+        """
+        try:
+            return os.path.join(self.store_dir, digest[:2], digest)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def link(self, content_path: str, file_path: str) -> None:
+        """
+        DESCRIPTION:
+        Make `file_path` a hardlink to the stored content. The link is
+        created under a temporary name and renamed over `file_path`, so
+        an existing file is replaced atomically and never written to.
+        If hardlinks are not supported, e.g. across file systems, the
+        content is copied instead.
+        ================================================================
+        RETURN: None
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok= True)
+            temp_file_path = f"{file_path}.tmp"
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            try:
+                os.link(content_path, temp_file_path)
+            except OSError:
+                logging.info(f"Hardlink not supported for: {file_path}, copying the content instead.")
+                shutil.copyfile(content_path, temp_file_path)
+            os.replace(temp_file_path, file_path)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def save(self, file_path: str, digest: str, write) -> str:
+        """
+        DESCRIPTION:
+        Save an artifact whose content digest is known before it is
+        written. `write` is called with a path and must write the content
+        to it. It is only called if no identical content is stored yet,
+        so an identical artifact of an earlier run costs no write at all.
+        ================================================================
+        RETURN:
+        str: The digest of the content.
+        """
+        try:
+            if not self.enabled:
+                os.makedirs(os.path.dirname(file_path), exist_ok= True)
+                write(file_path)
+                return digest
+
+            content_path = self.get_content_path(digest)
+            if os.path.exists(content_path):
+                logging.info(f"Content of: {file_path} already stored as: {digest}")
+            else:
+                os.makedirs(os.path.dirname(content_path), exist_ok= True)
+                temp_content_path = f"{content_path}.tmp"
+                write(temp_content_path)
+                os.replace(temp_content_path, content_path)
+            self.link(content_path, file_path)
+            return digest
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def save_bytes(self, file_path: str, data: bytes) -> str:
+        """
+        DESCRIPTION:
+        Save serialized artifact content to `file_path`, keyed by the
+        sha256 digest of the bytes.
+        ================================================================
+        RETURN:
+        str: The sha256 digest of the content.
+        """
+        try:
+            def write(path):
+                with open(path, "wb") as file_obj:
+                    file_obj.write(data)
+            return self.save(file_path, hashlib.sha256(data).hexdigest(), write)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def save_file(self, file_path: str) -> str:
+        """
+        DESCRIPTION:
+        Deduplicate an artifact that has already been written to
+        `file_path`, e.g. a dataset written chunk by chunk. If identical
+        content is already stored the file is replaced by a hardlink to
+        it, otherwise the file itself becomes the stored content. The file
+        and the stored content then share an inode, so writers of artifact
+        paths must write a temporary file and rename it over the path, as
+        every writer of src.utils does, and never write it in place.
+        ================================================================
+        RETURN:
+        str: The sha256 digest of the file.
+        """
+        try:
+            sha256 = hashlib.sha256()
+            with open(file_path, "rb") as file_obj:
+                for block in iter(lambda: file_obj.read(self.block_size), b""):
+                    sha256.update(block)
+            digest = sha256.hexdigest()
+            if not self.enabled:
+                return digest
+
+            content_path = self.get_content_path(digest)
+            if os.path.exists(content_path):
+                logging.info(f"Content of: {file_path} already stored as: {digest}")
+                self.link(content_path, file_path)
+            else:
+                os.makedirs(os.path.dirname(content_path), exist_ok= True)
+                try:
+                    os.link(file_path, content_path)
+                except OSError:
+                    shutil.copyfile(file_path, content_path)
+            return digest
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,77 @@
+#Importing required dependencies
+import os, sys
+import re
+import xgboost as xgb
+from glob import glob
+from typing import Optional
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+
+
+CHECKPOINT_FILE_PATTERN = "booster-{:06d}.json"
+
+
+class BoosterCheckpoint(xgb.callback.TrainingCallback):
+    """
+    DESCRIPTION:
+    Training callback saving the booster to `checkpoint_dir` every `interval`
+    boosting rounds. The file is named after the total number of rounds of
+    the booster, so rounds added after a resume keep increasing names, and it
+    is written under a temporary name and renamed, so a crash never leaves a
+    partially written checkpoint.
+    """
+
+    def __init__(self, checkpoint_dir: str, interval: int):
+        try:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            self.checkpoint_dir = checkpoint_dir
+            self.interval = interval
+            super().__init__()
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        try:
+            n_rounds = model.num_boosted_rounds()
+            if n_rounds % self.interval == 0:
+                file_path = os.path.join(self.checkpoint_dir, CHECKPOINT_FILE_PATTERN.format(n_rounds))
+                model.save_model(f"{file_path}.tmp.json")
+                os.replace(f"{file_path}.tmp.json", file_path)
+                logging.info(f"Booster checkpoint saved after {n_rounds} rounds: {file_path}")
+            #False lets the training go on
+            return False
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+def load_latest_checkpoint(checkpoint_dir: str) -> Optional[xgb.Booster]:
+    """
+    DESCRIPTION:
+        This function loads the booster of the checkpoint with the most
+        rounds in `checkpoint_dir`, if any.
+    ====================================================================================
+    RETURN:
+        xgboost.Booster or None
+    """
+    try:
+        checkpoints = dict()
+        for file_path in glob(os.path.join(checkpoint_dir, "booster-*.json")):
+            match = re.fullmatch(r"booster-(\d+)\.json", os.path.basename(file_path))
+            if match:
+                checkpoints[int(match.group(1))] = file_path
+        if len(checkpoints) == 0:
+            return None
+        n_rounds = max(checkpoints)
+        logging.info(f"Resuming from the booster checkpoint after {n_rounds} rounds: {checkpoints[n_rounds]}")
+        booster = xgb.Booster()
+        booster.load_model(checkpoints[n_rounds])
+        return booster
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
@@ -2,12 +2,16 @@
 import pandas as pd
 import numpy as np
 import sys, os
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
 from sklearn.model_selection import train_test_split
 #=============================================================
 from src.logger import logging
 from src.exception import APSException
 from src.entity import config_entity, artifact_entity
-from src.utils import get_collection_as_dataframe
+from src.config import TARGET_COLUMN, sensor_schema
+from src.artifact_store import artifact_store
+from src import utils
 
 
 class DataIngestion:
@@ -16,56 +20,251 @@ class DataIngestion:
         try:
             logging.info(f"{'>>'*20} Data Ingestion {'<<'*20}")
             self.data_ingestion_config = data_ingestion_config
+            #Digest of the exported feature store, known once it is saved to the artifact store
+            self.feature_store_hash = None
         except Exception as e:
             raise APSException(e, sys)
         
-    def initiate_data_ingestion(self) -> artifact_entity.DataIngestionArtifact:
+    def read_partition(self, query: dict) -> pd.DataFrame:
+        """
+        DESCRIPTION:
+        This function streams the documents matching `query` in batches and
+        returns them as one typed pandas DataFrame. It is run by the
+        worker threads of the "parallel" ingestion mode, which share the
+        connection pool of the MongoDB client.
+        ====================================================================
+        PARAMETERS:
+        query: MongoDB filter of the partition
+        ====================================================================
+        RETURN: Pandas DataFrame of the partition
+        """
+        try:
+            chunks = list(utils.get_collection_as_chunks(database_name = self.data_ingestion_config.database_name,
+                                                         collection_name = self.data_ingestion_config.collection_name,
+                                                         batch_size = self.data_ingestion_config.batch_size,
+                                                         query = query,
+                                                         schema = sensor_schema))
+            if len(chunks) == 0:
+                return pd.DataFrame()
+            return pd.concat(chunks, ignore_index=True)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def export_feature_store(self) -> pd.Series:
+        """
+        DESCRIPTION:
+        This function exports the collection into the feature store file
+        and returns its target column, which is all the train/test split
+        needs. In "stream" mode the collection is read in batches and every
+        batch is appended to the feature store as soon as it arrives, only
+        its target column being kept, in "parallel" mode the _id ranges of
+        the collection are read concurrently and concatenated in _id order,
+        in "full" mode the whole collection is loaded before it is written.
+        ====================================================================
+        RETURN: Pandas Series of the target column of the exported collection;
+        the digest of the feature store is kept in feature_store_hash
+        """
         try:
+            logging.info("Creating a folder name feature_store if not exist.")
+            feature_store_dir = os.path.dirname(self.data_ingestion_config.feature_store_file_path)
+            os.makedirs(feature_store_dir, exist_ok= True)
+
+            if self.data_ingestion_config.ingestion_mode == "stream":
+                logging.info(f"Streaming the data collection in batches of {self.data_ingestion_config.batch_size} documents.")
+                targets = []
+                writer = utils.DataFrameWriter(file_path = self.data_ingestion_config.feature_store_file_path)
+                for chunk in utils.get_collection_as_chunks(database_name = self.data_ingestion_config.database_name,
+                                                            collection_name = self.data_ingestion_config.collection_name,
+                                                            batch_size = self.data_ingestion_config.batch_size,
+                                                            schema = sensor_schema):
+                    logging.info(f"Appending batch of {chunk.shape[0]} rows to the feature store.")
+                    writer.write(chunk)
+                    targets.append(chunk[TARGET_COLUMN])
+                writer.close()
+                if writer.n_rows == 0:
+                    raise Exception(f"Collection: {self.data_ingestion_config.collection_name} is empty")
+                self.feature_store_hash = artifact_store.save_file(file_path = self.data_ingestion_config.feature_store_file_path)
+                logging.info(f"Rows in feature store: {writer.n_rows}")
+                return pd.concat(targets, ignore_index=True)
+
+            if self.data_ingestion_config.ingestion_mode == "parallel":
+                queries = utils.get_collection_id_ranges(database_name = self.data_ingestion_config.database_name,
+                                                         collection_name = self.data_ingestion_config.collection_name,
+                                                         n_partitions = self.data_ingestion_config.n_workers)
+                if len(queries) == 0:
+                    raise Exception(f"Collection: {self.data_ingestion_config.collection_name} is empty")
+                logging.info(f"Reading {len(queries)} partitions with {self.data_ingestion_config.n_workers} workers.")
+                with ThreadPoolExecutor(max_workers = self.data_ingestion_config.n_workers) as executor:
+                    #map returns the partitions in submission order, i.e. in _id order
+                    df = pd.concat(list(executor.map(self.read_partition, queries)), ignore_index=True)
+                logging.info(f"Row and columns in df: {df.shape}")
+                utils.save_dataframe(file_path = self.data_ingestion_config.feature_store_file_path, df = df)
+                self.feature_store_hash = artifact_store.save_file(file_path = self.data_ingestion_config.feature_store_file_path)
+                return df[TARGET_COLUMN]
+
             logging.info("Exporting the data collection as pandas' dataframe.")
-            df:pd.DataFrame = get_collection_as_dataframe(
+            df:pd.DataFrame = utils.get_collection_as_dataframe(
                 database_name = self.data_ingestion_config.database_name,
                 collection_name= self.data_ingestion_config.collection_name,
             )
-            
-            logging.info("Saving data in feature store folder.")
 
-            logging.info("Replacing na with numpy's NAN i.e. numpy.NAN")
-            df.replace(to_replace="na",value=np.NAN,inplace=True)
+            logging.info("Applying the sensor schema: na to numpy's NAN, features to float32 and target to category")
+            df = utils.apply_schema(df = df, schema = sensor_schema)
 
-            logging.info("Creating a folder name feature_store if not exist.")
-            feature_store_dir = os.path.dirname(self.data_ingestion_config.feature_store_file_path)
+            logging.info("Saving the DataFrame in freature_store folder")
+            utils.save_dataframe(file_path = self.data_ingestion_config.feature_store_file_path, df = df)
+            self.feature_store_hash = artifact_store.save_file(file_path = self.data_ingestion_config.feature_store_file_path)
+            return df[TARGET_COLUMN]
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_test_mask(self, target: pd.Series) -> np.ndarray:
+        """
+        DESCRIPTION:
+        This function splits rows into train and test rows from their target
+        column. The split is stratified if configured and if every class has
+        at least two rows, e.g. not for a small increment of the collection.
+        ====================================================================
+        PARAMETERS:
+        target: Pandas Series of the target column of the rows
+        ====================================================================
+        RETURN: boolean mask over the rows, True for test rows
+        """
+        try:
+            test_mask = np.zeros(target.shape[0], dtype=bool)
+            if target.shape[0] < 2:
+                return test_mask
+            stratify = self.data_ingestion_config.stratify and target.value_counts().loc[lambda counts: counts > 0].min() >= 2
+            _, test_index = train_test_split(np.arange(target.shape[0]),
+                                             test_size=self.data_ingestion_config.test_size,
+                                             random_state=self.data_ingestion_config.random_state,
+                                             stratify=target if stratify else None)
+            test_mask[test_index] = True
+            return test_mask
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def export_incremental_feature_store(self) -> np.ndarray:
+        """
+        DESCRIPTION:
+        This function reads only the documents whose `_id` is greater than
+        the persisted high-water mark and appends them as a new partition to
+        the persistent feature store. Only the new rows are split, from the
+        target column of the new partition, and their split is appended to
+        the persisted split of the earlier rows, so the cost of a run grows
+        with the new data and a test row of an earlier run never becomes a
+        train row. The watermark file lists the committed partitions and
+        their number of rows, and is replaced atomically after the partition
+        and the split are written, so a partition left behind by a failed run
+        is never loaded and is overwritten by the next run.
+        ====================================================================
+        RETURN: boolean mask over the rows of all the committed partitions, True for test rows
+        """
+        try:
+            feature_store_dir = self.data_ingestion_config.persistent_feature_store_dir
+            watermark_file_path = self.data_ingestion_config.watermark_file_path
+            split_file_path = self.data_ingestion_config.persistent_split_file_path
             os.makedirs(feature_store_dir, exist_ok= True)
 
-            logging.info("Saving the DataFrame in freature_store folder")
-            df.to_csv(path_or_buf=self.data_ingestion_config.feature_store_file_path,
-                      index = False,
-                      header = True,)
-            
+            watermark = {"last_id": None, "partitions": [], "n_rows": 0}
+            if os.path.exists(watermark_file_path):
+                watermark = utils.read_yaml_file(file_path = watermark_file_path)
+            logging.info(f"High-water mark of the feature store: {watermark['last_id']}")
+
+            if "n_rows" in watermark:
+                #Rows of a split written by a failed run after the last commit are dropped
+                test_mask = np.zeros(0, dtype=bool)
+                if watermark["n_rows"] > 0:
+                    test_mask = utils.load_numpy_array_data(file_path = split_file_path)[:watermark["n_rows"]]
+            else:
+                #Feature store written before the split was persisted: its committed partitions are split once
+                logging.info("Splitting the committed partitions of the feature store once.")
+                target = utils.load_feature_store(file_path = feature_store_dir,
+                                                  partitions = watermark["partitions"],
+                                                  columns = [TARGET_COLUMN],
+                                                  schema = sensor_schema)[TARGET_COLUMN] if watermark["partitions"] else pd.Series([], dtype=object)
+                test_mask = self.get_test_mask(target = target)
+                watermark["n_rows"] = test_mask.shape[0]
+
+            max_id = utils.get_collection_max_id(database_name = self.data_ingestion_config.database_name,
+                                                 collection_name = self.data_ingestion_config.collection_name)
+            if max_id is None or str(max_id) == watermark["last_id"]:
+                logging.info("No new documents found in the collection.")
+            else:
+                #Documents inserted while reading are left for the next run
+                query = {"_id": {"$lte": max_id}}
+                if watermark["last_id"] is not None:
+                    query["_id"]["$gt"] = ObjectId(watermark["last_id"])
+                partition_name = f"part-{len(watermark['partitions']):05d}.{self.data_ingestion_config.artifact_format}"
+                targets = []
+                writer = utils.DataFrameWriter(file_path = os.path.join(feature_store_dir, partition_name))
+                for chunk in utils.get_collection_as_chunks(database_name = self.data_ingestion_config.database_name,
+                                                            collection_name = self.data_ingestion_config.collection_name,
+                                                            batch_size = self.data_ingestion_config.batch_size,
+                                                            query = query,
+                                                            schema = sensor_schema):
+                    writer.write(chunk)
+                    targets.append(chunk[TARGET_COLUMN])
+                writer.close()
+                n_rows = writer.n_rows
+                logging.info(f"Appended {n_rows} new rows to the feature store as partition: {partition_name}")
+
+                if n_rows > 0:
+                    test_mask = np.concatenate([test_mask, self.get_test_mask(target = pd.concat(targets, ignore_index=True))])
+                    utils.save_numpy_array_data(file_path = split_file_path, array = test_mask)
+                    watermark = {"last_id": str(max_id),
+                                 "partitions": watermark["partitions"] + [partition_name],
+                                 "n_rows": test_mask.shape[0]}
+                    temp_file_path = f"{watermark_file_path}.tmp"
+                    utils.write_yaml_file(file_path = temp_file_path, data = watermark)
+                    os.replace(temp_file_path, watermark_file_path)
+                    logging.info(f"High-water mark moved to: {watermark['last_id']}")
+
+            if test_mask.shape[0] == 0:
+                raise Exception(f"Feature store: {feature_store_dir} is empty")
+            logging.info(f"Rows in feature store: {test_mask.shape[0]}, of which {int(test_mask.sum())} test rows")
+            return test_mask
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def initiate_data_ingestion(self) -> artifact_entity.DataIngestionArtifact:
+        try:
+            #Contents of the artifact store left unreferenced by deleted runs are freed before new artifacts are written
+            artifact_store.prune()
+
+            logging.info("Saving data in feature store folder.")
             logging.info(f"Split dataset into train and test dataset in ration: {1-self.data_ingestion_config.test_size}:{self.data_ingestion_config.test_size}.")
-            train_df, test_df = train_test_split(df,
-                                                 test_size=self.data_ingestion_config.test_size,
-                                                 random_state=self.data_ingestion_config.random_state)
-            
-            logging.info("Creating directory folder with name dataset for train and test dataset if not exist.")
-            dataset_dir = os.path.dirname(self.data_ingestion_config.train_file_path)
-            os.makedirs(dataset_dir,exist_ok=True)
-
-            logging.info("Converting the train DataFrame to .csv format and storing it in the directory: self.data_ingestion_config.train_file_path")
-            train_df.to_csv(path_or_buf = self.data_ingestion_config.train_file_path, 
-                            index = False, 
-                            header = True)
-            
-            logging.info("Converting the test DataFrame to .csv format and storing it in the directory: self.data_ingestion_config.test_file_path")
-            test_df.to_csv(path_or_buf = self.data_ingestion_config.test_file_path, 
-                            index = False, 
-                            header = True)
-
-            #Following are the objects returned by Data Ingestion component: complete dataset, train dataset and test dataset
-            data_ingestion_artifact = artifact_entity.DataIngestionArtifact(feature_store_file_path=self.data_ingestion_config.feature_store_file_path,
-                                                                            train_file_path=self.data_ingestion_config.train_file_path,
-                                                                            test_file_path=self.data_ingestion_config.test_file_path,)
+            if self.data_ingestion_config.ingestion_mode == "incremental":
+                test_mask = self.export_incremental_feature_store()
+                feature_store_file_path = self.data_ingestion_config.persistent_feature_store_dir
+                self.feature_store_hash = utils.get_dataset_hash(file_path = feature_store_file_path)
+            else:
+                target:pd.Series = self.export_feature_store()
+                test_mask = self.get_test_mask(target = target)
+                feature_store_file_path = self.data_ingestion_config.feature_store_file_path
+
+            logging.info("Saving the split as a boolean mask over the feature store rows instead of train and test copies.")
+            utils.save_numpy_array_data(file_path = self.data_ingestion_config.split_file_path, array = test_mask)
+
+            #Following are the objects returned by Data Ingestion component: complete dataset and the train/test split over it
+            data_ingestion_artifact = artifact_entity.DataIngestionArtifact(feature_store_file_path=feature_store_file_path,
+                                                                            split_file_path=self.data_ingestion_config.split_file_path,
+                                                                            feature_store_hash=self.feature_store_hash,
+                                                                            ingestion_mode=self.data_ingestion_config.ingestion_mode,)
             
-            logging.info("File paths of the following objects are returned by Data Ingestion component: feature_store, train dataset and test dataset")
+            logging.info("File paths of the following objects are returned by Data Ingestion component: feature_store and train/test split")
             logging.info(f"Data ingestion artifact: {data_ingestion_artifact}")
             return data_ingestion_artifact
         
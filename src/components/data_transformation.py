@@ -1,18 +1,17 @@
 #Importing required dependencies
-from typing import Optional
-import pandas as pd
 import numpy as np
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import RobustScaler, LabelEncoder
 import sys
-from imblearn.combine import SMOTETomek
+import sklearn
 #===========================================================
 from src.logger import logging
 from src.exception import APSException
 from src.entity import config_entity, artifact_entity
-from src.config import TARGET_COLUMN
-from src import utils
+from src.config import TARGET_COLUMN, sensor_schema
+from src import utils, sketch, rebalancing
+from src.transformer_cache import TransformerCache
 
 
 
@@ -26,6 +25,10 @@ class DataTransformation:
             logging.info(f"{'>>'*20} DATA TRANSFORMATION {'<<'*20}")
             self.data_transformation_config = data_transformation_config
             self.data_ingestion_artifact = data_ingestion_artifact
+            self.transformer_cache = None
+            if self.data_transformation_config.transformer_cache_size > 0:
+                self.transformer_cache = TransformerCache(cache_dir = self.data_transformation_config.transformer_cache_dir,
+                                                          max_entries = self.data_transformation_config.transformer_cache_size)
 
         except Exception as e:
             logging.error(APSException(e, sys))
@@ -47,6 +50,214 @@ class DataTransformation:
                 ('RobustScaler', robust_scaler)
                 ]
             )
+            return pipeline
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_rebalancing_strategy(self) -> str:
+        """
+        DESCRIPTION:
+        This function returns the rebalancing strategy applied to the train
+        dataset. Resampling needs the whole dataset in memory, so in chunked
+        mode the resampling strategies fall back to class weights.
+        =======================================================================
+        RETURN: one of src.rebalancing.REBALANCING_STRATEGIES
+        """
+        try:
+            strategy = self.data_transformation_config.rebalancing_strategy
+            if self.data_transformation_config.transformation_mode == "chunked" and strategy not in ("class_weight", "none"):
+                logging.info(f"Rebalancing strategy: {strategy} is not available in chunked mode, using class weights.")
+                return "class_weight"
+            return strategy
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def is_resampling_deferred(self, rebalancing_strategy: str) -> bool:
+        """
+        DESCRIPTION:
+        This function tells whether the resampling of the train dataset is
+        left to the model trainer. In "incremental" ingestion mode the latest
+        model may keep boosting on the new rows only, which it rebalances
+        itself, so resampling every row of the growing feature store here
+        would be wasted: the model trainer resamples the train dataset only
+        when it trains from scratch.
+        =======================================================================
+        RETURN: True if the train dataset is saved without resampling
+        """
+        try:
+            return (rebalancing.is_resampling(rebalancing_strategy)
+                    and self.data_ingestion_artifact.ingestion_mode == "incremental")
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_transformer_cache_key(self,
+                                  transformation_pipeline: Pipeline,
+                                  label_encoder: LabelEncoder,
+                                  rebalancing_strategy: str) -> str:
+        """
+        DESCRIPTION:
+        This function computes the key of the transformer cache: the hashes
+        of the feature store, computed by the data ingestion while it was
+        written, and of the train/test split, which fingerprint the training
+        input without reading it again, and the parameters of the objects
+        fitted on it.
+        =======================================================================
+        RETURN: cache key in hexadecimal format
+        """
+        try:
+            return TransformerCache.get_key(
+                self.data_ingestion_artifact.feature_store_hash or utils.get_dataset_hash(file_path = self.data_ingestion_artifact.feature_store_file_path),
+                utils.get_file_hash(file_path = self.data_ingestion_artifact.split_file_path),
+                TARGET_COLUMN,
+                sensor_schema,
+                transformation_pipeline,
+                label_encoder,
+                rebalancing_strategy,
+                self.is_resampling_deferred(rebalancing_strategy = rebalancing_strategy),
+                #The number of cores does not change the resampled dataset, so it is left out of the key
+                rebalancing.get_resampler(strategy = rebalancing_strategy, random_state = config_entity.RANDOM_STATE),
+                self.data_transformation_config.transformation_mode,
+                self.data_transformation_config.sketch_size,
+                self.data_transformation_config.target_dtype,
+                sklearn.__version__,
+            )
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def fit_transformer_from_chunks(self, transformation_pipeline: Pipeline) -> Pipeline:
+        """
+        DESCRIPTION:
+        This function fits the transformation pipeline on the train dataset
+        read chunk by chunk. The pipeline is fitted on the first chunk, which
+        sets the feature names and the constant of the imputer, then the
+        median and the interquartile range of the robust scaler are replaced
+        by the ones of per-column quantile sketches of every imputed chunk.
+        The rank of every quantile is within the logged error bound of the
+        one computed by sklearn on the whole dataset.
+        =======================================================================
+        PARAMETERS:
+        transformation_pipeline: pipeline of get_data_transformer_object
+        =======================================================================
+        RETURN: fitted pipeline
+        """
+        try:
+            imputer = transformation_pipeline.named_steps["Imputer"]
+            robust_scaler = transformation_pipeline.named_steps["RobustScaler"]
+            quantile_sketches = None
+            for chunk in utils.iter_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                          split_file_path = self.data_ingestion_artifact.split_file_path,
+                                          subset = "train",
+                                          batch_size = self.data_transformation_config.batch_size,
+                                          schema = sensor_schema):
+                input_feature_df = chunk.drop(TARGET_COLUMN, axis=1)
+                if quantile_sketches is None:
+                    transformation_pipeline.fit(input_feature_df)
+                    quantile_sketches = [sketch.QuantileSketch(k = self.data_transformation_config.sketch_size, seed = j)
+                                         for j in range(input_feature_df.shape[1])]
+                input_feature_arr = imputer.transform(input_feature_df)
+                for j, quantile_sketch in enumerate(quantile_sketches):
+                    quantile_sketch.update(input_feature_arr[:, j])
+            if quantile_sketches is None:
+                raise Exception("Train dataset is empty.")
+
+            q_min, q_max = robust_scaler.quantile_range
+            quantiles = np.array([quantile_sketch.get_quantiles([q_min / 100, 0.5, q_max / 100])
+                                  for quantile_sketch in quantile_sketches])
+            if robust_scaler.with_centering:
+                robust_scaler.center_ = quantiles[:, 1]
+            if robust_scaler.with_scaling:
+                scale = quantiles[:, 2] - quantiles[:, 0]
+                #Constant columns are not scaled, as in sklearn
+                scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+                robust_scaler.scale_ = scale
+            error_bound = max(quantile_sketch.get_error_bound() for quantile_sketch in quantile_sketches)
+            logging.info(f"Robust scaler fitted on {quantile_sketches[0].n} rows, quantile rank error bound: {error_bound}")
+            return transformation_pipeline
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def transform_chunks(self,
+                         transformation_pipeline: Pipeline,
+                         label_encoder: LabelEncoder,
+                         subset: str,
+                         file_path: str,
+                         target_file_path: str) -> None:
+        """
+        DESCRIPTION:
+        This function transforms the train or test dataset chunk by chunk
+        and writes the input features and the encoded target column of every
+        transformed chunk straight to their transformed array files.
+        =======================================================================
+        PARAMETERS:
+        transformation_pipeline: fitted transformation pipeline
+        label_encoder: fitted label encoder
+        subset: "train" or "test"
+        file_path: location of the transformed input features
+        target_file_path: location of the encoded target column
+        =======================================================================
+        RETURN: None
+        """
+        try:
+            test_mask = np.load(self.data_ingestion_artifact.split_file_path, mmap_mode="r")
+            n_rows = int(test_mask.sum()) if subset == "test" else int((~test_mask).sum())
+            array_writer = utils.NumpyArrayWriter(file_path = file_path, n_rows = n_rows)
+            target_writer = utils.NumpyArrayWriter(file_path = target_file_path, n_rows = n_rows)
+            for chunk in utils.iter_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                          split_file_path = self.data_ingestion_artifact.split_file_path,
+                                          subset = subset,
+                                          batch_size = self.data_transformation_config.batch_size,
+                                          schema = sensor_schema):
+                array_writer.write(transformation_pipeline.transform(chunk.drop(TARGET_COLUMN, axis=1))
+                                   .astype(sensor_schema.feature_dtype, copy=False))
+                target_writer.write(label_encoder.transform(chunk[TARGET_COLUMN])
+                                    .astype(self.data_transformation_config.target_dtype))
+            array_writer.close()
+            target_writer.close()
+            logging.info(f"Transformed {n_rows} rows of {subset} dataset into: {file_path}")
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_data_transformation_artifact(self, rebalancing_strategy: str) -> artifact_entity.DataTransformationArtifact:
+        try:
+            #Creating artifact of Data Transformation
+            logging.info("Creating Data Transformation artifact.")
+            data_transformation_artifact = artifact_entity.DataTransformationArtifact(
+                transform_object_path = self.data_transformation_config.transform_object_path,
+                target_encoder_path = self.data_transformation_config.target_encoder_path,
+                transformed_train_path = self.data_transformation_config.transformed_train_path,
+                transformed_test_path = self.data_transformation_config.transformed_test_path,
+                transformed_train_target_path = self.data_transformation_config.transformed_train_target_path,
+                transformed_test_target_path = self.data_transformation_config.transformed_test_target_path,
+                rebalancing_strategy = rebalancing_strategy,
+                rebalancing_n_jobs = self.data_transformation_config.rebalancing_n_jobs,
+                transformed_train_unbalanced_path = self.data_transformation_config.transformed_train_unbalanced_path,
+                transformed_train_unbalanced_target_path = self.data_transformation_config.transformed_train_unbalanced_target_path,
+                resampling_deferred = self.is_resampling_deferred(rebalancing_strategy = rebalancing_strategy),
+            )
+            if not rebalancing.is_resampling(rebalancing_strategy) or data_transformation_artifact.resampling_deferred:
+                data_transformation_artifact.transformed_train_unbalanced_path = self.data_transformation_config.transformed_train_path
+                data_transformation_artifact.transformed_train_unbalanced_target_path = self.data_transformation_config.transformed_train_target_path
+            logging.info(f"Data transformation object {data_transformation_artifact}")
+
+            return data_transformation_artifact
 
         except Exception as e:
             logging.error(APSException(e, sys))
@@ -55,11 +266,66 @@ class DataTransformation:
 
     def initiate_data_transformation(self,) -> artifact_entity.DataTransformationArtifact:
         try:
+            logging.info("Creating instance of transformation pipeline.")
+            transformation_pipeline = DataTransformation.get_data_transformer_object()
+            logging.info("Creating instance of label encoder.")
+            label_encoder = LabelEncoder()
+            rebalancing_strategy = self.get_rebalancing_strategy()
+
+            #Files of a cache entry and their location in this run
+            cache_file_paths = {
+                "transformer.pkl": self.data_transformation_config.transform_object_path,
+                "target_encoder.pkl": self.data_transformation_config.target_encoder_path,
+                "train.npz": self.data_transformation_config.transformed_train_path,
+                "test.npz": self.data_transformation_config.transformed_test_path,
+                "train_target.npz": self.data_transformation_config.transformed_train_target_path,
+                "test_target.npz": self.data_transformation_config.transformed_test_target_path,
+            }
+            resampling_deferred = self.is_resampling_deferred(rebalancing_strategy = rebalancing_strategy)
+            if rebalancing.is_resampling(rebalancing_strategy) and not resampling_deferred:
+                cache_file_paths["train_unbalanced.npz"] = self.data_transformation_config.transformed_train_unbalanced_path
+                cache_file_paths["train_unbalanced_target.npz"] = self.data_transformation_config.transformed_train_unbalanced_target_path
+            if self.transformer_cache is not None:
+                cache_key = self.get_transformer_cache_key(transformation_pipeline = transformation_pipeline,
+                                                           label_encoder = label_encoder,
+                                                           rebalancing_strategy = rebalancing_strategy)
+                if self.transformer_cache.load(key = cache_key, file_paths = cache_file_paths):
+                    logging.info("Training input unchanged, reusing the fitted objects and the transformed datasets.")
+                    return self.get_data_transformation_artifact(rebalancing_strategy = rebalancing_strategy)
+
+            if self.data_transformation_config.transformation_mode == "chunked":
+                #The categories of the target column are declared by the schema, so no pass over the data is needed
+                logging.info("Fitting label encoder on the categories of the target column.")
+                label_encoder.fit(list(sensor_schema.target_categories))
+                logging.info(f"Fitting transformation_pipeline in chunks of {self.data_transformation_config.batch_size} rows.")
+                transformation_pipeline = self.fit_transformer_from_chunks(transformation_pipeline = transformation_pipeline)
+                for subset, file_path, target_file_path in (
+                        ("train", self.data_transformation_config.transformed_train_path, self.data_transformation_config.transformed_train_target_path),
+                        ("test", self.data_transformation_config.transformed_test_path, self.data_transformation_config.transformed_test_target_path)):
+                    self.transform_chunks(transformation_pipeline = transformation_pipeline,
+                                          label_encoder = label_encoder,
+                                          subset = subset,
+                                          file_path = file_path,
+                                          target_file_path = target_file_path)
+                utils.save_object(file_path = self.data_transformation_config.transform_object_path,
+                                  obj = transformation_pipeline)
+                utils.save_object(file_path = self.data_transformation_config.target_encoder_path,
+                                  obj = label_encoder)
+                if self.transformer_cache is not None:
+                    self.transformer_cache.store(key = cache_key, file_paths = cache_file_paths)
+                return self.get_data_transformation_artifact(rebalancing_strategy = rebalancing_strategy)
+
             #Loading datasets
             logging.info("Loading train dataset")
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
+            train_df = utils.load_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                        split_file_path = self.data_ingestion_artifact.split_file_path,
+                                        subset = "train",
+                                        schema = sensor_schema)
             logging.info("Loading test dataset")
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            test_df = utils.load_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                        split_file_path = self.data_ingestion_artifact.split_file_path,
+                                        subset = "test",
+                                        schema = sensor_schema)
 
             #Preparing train dataset and test dataset containing input features only
             logging.info("Dropping Target column from train dataset.")
@@ -74,53 +340,54 @@ class DataTransformation:
             target_feature_test_df = test_df[TARGET_COLUMN]
 
             #Label encoding target column
-            logging.info("Creating instance of label encoder.")
-            label_encoder = LabelEncoder()
             logging.info("Fitting label encoder")
             label_encoder.fit(target_feature_train_df)
             logging.info("Applying label encoder on target objects.")
-            target_feature_train_df = label_encoder.transform(target_feature_train_df)
-            target_feature_test_df  = label_encoder.transform(target_feature_test_df)
+            target_dtype = self.data_transformation_config.target_dtype
+            target_feature_train_arr = label_encoder.transform(target_feature_train_df).astype(target_dtype)
+            target_feature_test_arr  = label_encoder.transform(target_feature_test_df).astype(target_dtype)
 
             #Transformation pipeline
-            logging.info("Creating instance of transformation pipeline.")
-            transformation_pipeline = DataTransformation.get_data_transformer_object()
             logging.info("Fitting transformation_pipeline")
+            transformation_pipeline.fit(input_feature_train_df)
             logging.info("Applying transformation_pipeline on input_feature objects.")
-            input_feature_train_df = transformation_pipeline.transform(input_feature_train_df)
-            input_feature_test_df  = transformation_pipeline.transform(input_feature_test_df)
-
-            #SMOTETomek
-            logging.info("Creating instance of SMOTEK.")
-            smt = SMOTETomek(random_state=config_entity.RANDOM_STATE)
-            logging.info("Applying SMOTETomek on training dataset.")
-            logging.info(f"Before applying SMOTETomek on training dataset shape of || Input: {input_feature_train_arr.shape} Target:{target_feature_train_arr.shape}")
-            input_feature_train_arr, target_feature_train_arr = smt.fit_resample(input_feature_train_arr, target_feature_train_arr)
-            logging.info(f"After applying SMOTETomek on training dataset shape of || Input: {input_feature_train_arr.shape} Target:{target_feature_train_arr.shape}")
-            logging.info("Applying SMOTETomek on testing dataset.")
-            logging.info(f"Before applying SMOTETomek on testing dataset shape of || Input: {input_feature_test_arr.shape} Target:{target_feature_test_arr.shape}")
-            input_feature_test_arr, target_feature_test_arr = smt.fit_resample(input_feature_test_arr, target_feature_test_arr)
-            logging.info(f"After applying SMOTETomek on testing dataset shape of || Input: {input_feature_test_arr.shape} Target:{target_feature_test_arr.shape}")
-
-            #Concatenating input feature and target column for both train and test dataset.
-            logging.info("Concatenating the input feature and target column to prepare training dataset.")
-            train_arr = np.c_[
-                input_feature_train_arr,
-                target_feature_train_arr
-            ]
-            logging.info("Concatenating the input feature and target column to prepare testing dataset.")
-            test_arr = np.c_[
-                input_feature_test_arr,
-                target_feature_test_arr
-            ]
-
-            #Saving above datasets in NumPy.array format
+            input_feature_train_arr = transformation_pipeline.transform(input_feature_train_df)
+            input_feature_test_arr  = transformation_pipeline.transform(input_feature_test_df)
+
+            #Training dataset before resampling, from which validation folds are carved out
+            if resampling_deferred:
+                logging.info(f"Resampling with strategy: {rebalancing_strategy} is left to the model trainer.")
+                rebalancing_strategy_applied = "none"
+            else:
+                rebalancing_strategy_applied = rebalancing_strategy
+            if rebalancing.is_resampling(rebalancing_strategy_applied):
+                logging.info("Saving train dataset before resampling as NumPy.array format")
+                utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_train_unbalanced_path,
+                                            array = input_feature_train_arr.astype(sensor_schema.feature_dtype, copy=False))
+                utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_train_unbalanced_target_path,
+                                            array = target_feature_train_arr.astype(target_dtype, copy=False))
+
+            #Rebalancing the classes of the training dataset only, the test dataset keeps the real class distribution
+            logging.info(f"Rebalancing training dataset with strategy: {rebalancing_strategy_applied}")
+            input_feature_train_arr, target_feature_train_arr = rebalancing.rebalance(
+                X = input_feature_train_arr,
+                y = target_feature_train_arr,
+                strategy = rebalancing_strategy_applied,
+                n_jobs = self.data_transformation_config.rebalancing_n_jobs,
+                random_state = config_entity.RANDOM_STATE)
+
+            #Input features and target column are saved apart, so each keeps its own dtype:
+            #the feature dtype of the sensor schema and the target dtype of the configuration
             logging.info("Saving train dataset as NumPy.array format")
             utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_train_path,
-                                        array = train_arr)
+                                        array = input_feature_train_arr.astype(sensor_schema.feature_dtype, copy=False))
+            utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_train_target_path,
+                                        array = target_feature_train_arr.astype(target_dtype, copy=False))
             logging.info("Saving test dataset as NumPy.array format")
-            utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_train_path,
-                                        array = train_arr)
+            utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_test_path,
+                                        array = input_feature_test_arr.astype(sensor_schema.feature_dtype, copy=False))
+            utils.save_numpy_array_data(file_path = self.data_transformation_config.transformed_test_target_path,
+                                        array = target_feature_test_arr.astype(target_dtype, copy=False))
 
             #saving the created instances as object as per requirements
             logging.info("Saving transformation_pipeline as an object.")
@@ -129,18 +396,11 @@ class DataTransformation:
             logging.info("Saving label_encoder as an object.")
             utils.save_object(file_path = self.data_transformation_config.target_encoder_path,
                               obj = label_encoder)
-            
-            #Creating artifact of Data Transformation
-            logging.info("Creating Data Transformation artifact.")
-            data_transformation_artifact = artifact_entity.DataTransformationArtifact(
-                transform_object_path = self.data_transformation_config.transform_object_path,
-                target_encoder_path = self.data_transformation_config.target_encoder_path,
-                transformed_train_path = self.data_transformation_config.transformed_train_path,
-                transformed_test_path = self.data_transformation_config.transformed_test_path,
-            )
-            logging.info(f"Data transformation object {data_transformation_artifact}")
 
-            return data_transformation_artifact
+            if self.transformer_cache is not None:
+                self.transformer_cache.store(key = cache_key, file_paths = cache_file_paths)
+
+            return self.get_data_transformation_artifact(rebalancing_strategy = rebalancing_strategy)
 
 
         except Exception as e:
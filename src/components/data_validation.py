@@ -1,14 +1,11 @@
 #Import required dependencies
-from scipy.stats import ks_2samp
-from typing import Optional
-import os, sys
-import pandas as pd
+import sys
 import numpy as np
 #=============================================================
 from src.logger import logging
 from src.exception import APSException
-from src import utils
-from src.config import TARGET_COLUMN
+from src import utils, drift, dataset_profile, sketch
+from src.config import sensor_schema
 from src.entity import artifact_entity, config_entity
 
 
@@ -29,51 +26,45 @@ class DataValidaton:
 
 
     def drop_missing_values_column(self,
-                                   df: pd.DataFrame,
-                                   report_key_name: str) -> Optional[pd.DataFrame]:
+                                   profile: dataset_profile.DatasetProfile,
+                                   report_key_name: str) -> list:
         """
         DESCRIPTION:
-        This function drops columns from a Pandas DataFrame df that contain 
+        This function selects the columns of a profiled dataset that contain 
         missing values above a specified threshold. It also logs information 
         about the process and updates a validation error dictionary.
         =======================================================================
         PARAMETERS: 
-        df: Pandas DataFrame
+        profile: DatasetProfile of the dataset
         report_key_name: key of the dictionary type report
         =======================================================================
-        RETURN: Pandas DataFrame with dropped columns which have more missing 
-        values more thamn threshold value."""
+        RETURN: List of the columns having missing values within the threshold
+        value."""
         try:
-            logging.info("Calculating the percentage of missing values for each column in the DataFrame df.")
-            null_report = df.isna().sum/df.shape[0]
+            null_report = profile.get_null_fraction()
 
             threshold = self.data_validation_config.missing_threshold
             logging.info(f"Threshold limit for missing values for every column: {threshold}")
 
             logging.info(f"Selecting column name containing null values more than the threshold limit.")
-            drop_column_names = null_report[ null_report > threshold ].index
-            list_drop_column_names = list(drop_column_names)
+            list_drop_column_names = list(null_report[ null_report > threshold ].index)
             logging.info(f"Columns containg missing values more than threshold limit: {list_drop_column_names}")
             self.validation_report[report_key_name] = list_drop_column_names
 
-            logging.info(f"Dropping the above columns from the dataframe")
-            df.drop(list_drop_column_names,
-                    axis=1,
-                    inplace= True)
             #Condition if all the columns are removed 
-            if len(df.columns) == 0:
-                logging.info(f"Returned dataframe is empty.")
-                return None
-            return df
+            columns = list(null_report[ null_report <= threshold ].index)
+            if len(columns) == 0:
+                logging.info(f"No column is left within the threshold limit.")
+            return columns
         
         except Exception as e:
             logging.error(APSException(e,sys))
             raise APSException(e,sys)
-        
 
-    def is_required_columns_exist(self,
-                                  base_df: pd.DataFrame,
-                                  current_df: pd.DataFrame,
+
+    def is_required_columns_exists(self,
+                                  base_columns: list,
+                                  current_columns: list,
                                   report_key_name: str) -> bool:
         """
         DESCRIPTION:
@@ -84,8 +75,8 @@ class DataValidaton:
         are present, it returns True.
         =========================================================================
         PARAMETERS:
-        base_df: Pandas DataFrame representing the base dataset
-        current_df: Pandas DataFrame representing the current dataset
+        base_columns: Columns of the base dataset
+        current_columns: Columns of the current dataset
         report_key_name: It is a string representing the name of the report 
         to be generated.
         =========================================================================
@@ -93,9 +84,6 @@ class DataValidaton:
         The function returns a boolean value indicating whether the current 
         dataframe is having all the columns of base dataframe or not. """
         try:
-            base_columns = base_df.columns
-            current_columns = current_df.columns
-
             missing_columns = []
 
             for base_column in base_columns:
@@ -115,8 +103,9 @@ class DataValidaton:
 
 
     def data_drift(self,
-                   base_df: pd.DataFrame,
-                   current_df: pd.DataFrame,
+                   base_profile: dataset_profile.DatasetProfile,
+                   base_columns: list,
+                   current_profile: dataset_profile.DatasetProfile,
                    report_key_name: str):
         """
         DESCRIPTION:
@@ -125,8 +114,9 @@ class DataValidaton:
         two datasets and updating a report with the results of this analysis.
         ==============================================================================
         PARAMETERS:
-        base_df: Pandas DataFrame representing the base dataset
-        current_df: Pandas DataFrame representing the current dataset
+        base_profile: DatasetProfile of the base dataset
+        base_columns: Columns of the base dataset to be tested
+        current_profile: DatasetProfile of the current dataset
         report_key_name: Name of the report to be generated
         ==============================================================================
         RETURN: 
@@ -134,83 +124,113 @@ class DataValidaton:
         """
         try:
             drift_report = dict()
-            base_columns = base_df.columns
-            current_columns = current_df.columns
+            #Only the columns coercible to numbers in both datasets are tested. Both profiles hold
+            #sorted values, so the stable sort of the drift engine only merges two sorted runs.
+            columns = [column for column in base_profile.numeric_columns
+                       if column in base_columns and column in current_profile.numeric_columns]
+            metrics = self.data_validation_config.drift_metrics
+            logging.info("Our null hypthesis is the specific column will be having same distribution for both the dataset.")
+            logging.info(f"Computing drift metrics {metrics} on {len(columns)} columns.")
+            results = drift.drift_columns(base_arr = base_profile.get_values_array(columns),
+                                          current_arr = current_profile.get_values_array(columns),
+                                          metrics = metrics,
+                                          n_workers = self.data_validation_config.drift_n_workers)
 
-            for base_column in base_columns:
-                base_data, current_data = base_df[base_column], current_df[base_column]
-                logging.info(f"Hypothesis -> {base_column} [ {base_data.dtype} || {current_data.dtype} ]")
-                logging.info("Our null hypthesis is the specific column will be having same distribution for both the dataset.")
-                same_distribution = ks_2samp(base_data, current_data)
-
-                if same_distribution.pvalue > 0.05:
-                    logging.info("Accepting null hypothesis.")
-                    drift_report[base_column] = {
-                        "pvalues": float(same_distribution.pvalue),
-                        "Same_distribution": True
-                    }
-                else:
-                    logging.info("Rejecting null hypothesis.")
-                    drift_report[base_column] = {
-                        "pvalues": float(same_distribution.pvalue),
-                        "Same_distribution": True
-                    }
+            for i, column in enumerate(columns):
+                column_report = {metric: float(values[i]) for metric, values in results.items()}
+                if "ks" in column_report:
+                    column_report["pvalues"] = column_report.pop("ks")
+                #A column without values in either dataset gets NaN metrics: it is reported, not taken as drift
+                if any(np.isnan(results[metric][i]) for metric in ("ks", "psi") if metric in results):
+                    logging.info(f"Hypothesis -> {column}: insufficient data, no values in one of the datasets.")
+                    column_report["Insufficient_data"] = True
+                    column_report["Same_distribution"] = None
+                    drift_report[column] = column_report
+                    continue
+                same_distribution = True
+                if "ks" in results:
+                    same_distribution &= bool(results["ks"][i] > 0.05)
+                if "psi" in results:
+                    same_distribution &= bool(results["psi"][i] <= self.data_validation_config.psi_threshold)
+                logging.info(f"Hypothesis -> {column}: {'Accepting' if same_distribution else 'Rejecting'} null hypothesis.")
+                column_report["Same_distribution"] = same_distribution
+                drift_report[column] = column_report
 
-                self.validation_report[report_key_name] = drift_report
+            self.validation_report[report_key_name] = drift_report
 
         except Exception as e:
             logging.error(APSException(e, sys))
             raise APSException(e,sys)
 
 
-    def initiate_data_validation(self) -> artifact_entity.DataValidationArtifact:
+    def validate_sketched_dataset(self,
+                                  base_profile: dataset_profile.DatasetProfile,
+                                  base_columns: list,
+                                  sketched_dataset: sketch.SketchedDataset,
+                                  dataset_name: str) -> None:
+        """
+        DESCRIPTION:
+        This function runs the missing values check, the column presence
+        check and an approximate KS drift test on a dataset that was read
+        chunk by chunk into per-column quantile sketches. The KS statistic
+        of every column is within the reported `statistic_error_bound` of
+        the exact one, see src.sketch.QuantileSketch.
+        ==============================================================================
+        PARAMETERS:
+        base_profile: DatasetProfile of the base dataset
+        base_columns: Columns of the base dataset within the missing values threshold
+        sketched_dataset: SketchedDataset of the current dataset
+        dataset_name: Name of the dataset used in the report keys, e.g. "train"
+        ==============================================================================
+        RETURN: None
+        """
+        try:
+            null_report = sketched_dataset.get_null_fraction()
+            threshold = self.data_validation_config.missing_threshold
+            list_drop_column_names = list(null_report[ null_report > threshold ].index)
+            logging.info(f"Columns containg missing values more than threshold limit: {list_drop_column_names}")
+            self.validation_report[f"missing_values_within_{dataset_name}_dataset"] = list_drop_column_names
+            current_columns = [column for column in sketched_dataset.columns if column not in list_drop_column_names]
+
+            missing_columns = [column for column in base_columns if column not in current_columns]
+            if len(missing_columns) > 0:
+                logging.info(f"Columns not available in {dataset_name} dataset: {missing_columns}")
+                self.validation_report[f"missing_columns_within_{dataset_name}_dataset"] = missing_columns
+                return
+
+            if self.data_validation_config.drift_metrics != ["ks"]:
+                logging.info("Only the KS test is available on sketched datasets.")
+            drift_report = dict()
+            for column in base_profile.numeric_columns:
+                if column not in base_columns or column not in sketched_dataset.sketches:
+                    continue
+                statistic, pvalue, error_bound = sketch.ks_2samp_sketch(
+                    base_values = base_profile.get_sorted_values(column).astype(np.float64),
+                    sketch = sketched_dataset.sketches[column])
+                if np.isnan(pvalue):
+                    logging.info(f"Hypothesis -> {column}: insufficient data, no values in one of the datasets.")
+                    drift_report[column] = {
+                        "pvalues": float(pvalue),
+                        "Insufficient_data": True,
+                        "Same_distribution": None
+                    }
+                    continue
+                same_distribution = bool(pvalue > 0.05)
+                logging.info(f"Hypothesis -> {column}: {'Accepting' if same_distribution else 'Rejecting'} null hypothesis.")
+                drift_report[column] = {
+                    "pvalues": float(pvalue),
+                    "statistic_error_bound": float(error_bound),
+                    "Same_distribution": same_distribution
+                }
+            self.validation_report[f"data_drift_within_{dataset_name}_dataset"] = drift_report
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def write_validation_report(self) -> artifact_entity.DataValidationArtifact:
         try:
-            logging.info("Loading dataframes: Base DataFrame, Train DataFrame, Test DataFrame")
-            base_df = pd.read_csv(self.data_validation_config.base)
-            logging.info("Loaded Base DataFrame")
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
-            logging.info("Loaded Train DataFrame")
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
-            logging.info("Loaded Test DataFrame")
-            
-            logging.info("replacing any 'na' values with np.NAN values in base_df.")
-            base_df.replace({"na":np.NAN}, inplace = True)
-            
-            #Dropping columns having missing values more than threshold value.
-            #Base DataFrame
-            logging.info("Checking for missing values column wise and dropping the columns having execcessive missing values in base dataset.")
-            base_df = self.drop_missing_values_column(df = base_df, 
-                                                      report_key_name = "missing_values_within_base_dataset")
-            #Train DataFrame
-            logging.info("Checking for missing values column wise and dropping the columns having execcessive missing values in train dataset.")
-            base_df = self.drop_missing_values_column(df = train_df, 
-                                                      report_key_name = "missing_values_within_train_dataset")
-            #Test DataFrame
-            logging.info("Checking for missing values column wise and dropping the columns having execcessive missing values in test dataset.")
-            base_df = self.drop_missing_values_column(df = test_df, 
-                                                      report_key_name = "missing_values_within_test_dataset")         
-            
-            #Converting the data type of each and every columns of Base DataFrame, Train DataFrame and Test DataFrame
-            #into float type except the excluded column.
-            #Excluding column declared
-            exclude_columns = [TARGET_COLUMN]
-            logging.info("Converting the columns of Base DataFrame into float type.")
-            base_df = utils.convert_columns_float(df=base_df, exclude_columns=exclude_columns)
-            logging.info("Converting the columns of Train DataFrame into float type.")
-            train_df = utils.convert_columns_float(df=train_df, exclude_columns=exclude_columns)
-            logging.info("Converting the columns of Test DataFrame into float type.")
-            test_df = utils.convert_columns_float(df=test_df, exclude_columns=exclude_columns)
-
-            #Validating the columns in base dataframe, train dataframe and test dataframe:
-            logging.info(f"Validating columns in train dataframe.")
-            train_df_columns_status = self.is_required_columns_exists(base_df=base_df,
-                                                                      current_df=train_df,
-                                                                      report_key_name="missing_columns_within_train_dataset")
-            logging.info(f"Validating columns in test dataframe.")
-            test_df_columns_status = self.is_required_columns_exists(base_df=base_df,
-                                                                     current_df=test_df,
-                                                                     report_key_name="missing_columns_within_test_dataset")
-            
             #Writing the report of the hypothesis testing
             logging.info("Writing report in yaml file.")
             utils.write_yaml_file(file_path = self.data_validation_config.report_file_path,
@@ -221,6 +241,76 @@ class DataValidaton:
             
             return data_validation_artifact
 
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def initiate_data_validation(self) -> artifact_entity.DataValidationArtifact:
+        try:
+            logging.info("Loading base dataset profile")
+            base_profile = dataset_profile.get_base_profile(base_file_path = self.data_validation_config.base_file_path,
+                                                            profile_file_path = self.data_validation_config.base_profile_file_path,
+                                                            schema = sensor_schema)
+            logging.info("Loaded base dataset profile")
+
+            #Dropping columns having missing values more than threshold value.
+            #Base dataset
+            logging.info("Checking for missing values column wise and dropping the columns having execcessive missing values in base dataset.")
+            base_columns = self.drop_missing_values_column(profile = base_profile,
+                                                           report_key_name = "missing_values_within_base_dataset")
+
+            if self.data_validation_config.validation_mode == "stream":
+                #Train and test datasets are read chunk by chunk into quantile sketches
+                for subset in ("train", "test"):
+                    logging.info(f"Sketching {subset} dataset in chunks of {self.data_validation_config.batch_size} rows.")
+                    sketched_dataset = sketch.sketch_dataframe_chunks(
+                        chunks = utils.iter_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                                  split_file_path = self.data_ingestion_artifact.split_file_path,
+                                                  subset = subset,
+                                                  batch_size = self.data_validation_config.batch_size,
+                                                  schema = sensor_schema),
+                        k = self.data_validation_config.sketch_size)
+                    self.validate_sketched_dataset(base_profile = base_profile,
+                                                   base_columns = base_columns,
+                                                   sketched_dataset = sketched_dataset,
+                                                   dataset_name = subset)
+                return self.write_validation_report()
+
+            #Every dataset is profiled in a single pass and all the checks below read from its profile
+            profiles = dict()
+            for subset in ("train", "test"):
+                logging.info(f"Loading {subset} DataFrame")
+                df = utils.load_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                      split_file_path = self.data_ingestion_artifact.split_file_path,
+                                      subset = subset,
+                                      schema = sensor_schema)
+                logging.info(f"Profiling {subset} DataFrame")
+                profiles[subset] = dataset_profile.build_dataset_profile(df = df)
+                del df
+
+            for subset, profile in profiles.items():
+                #Dropping columns having missing values more than threshold value.
+                logging.info(f"Checking for missing values column wise and dropping the columns having execcessive missing values in {subset} dataset.")
+                current_columns = self.drop_missing_values_column(profile = profile,
+                                                                  report_key_name = f"missing_values_within_{subset}_dataset")
+
+                #Validating the columns in base dataset against the current dataset
+                logging.info(f"Validating columns in {subset} dataframe.")
+                columns_status = self.is_required_columns_exists(base_columns = base_columns,
+                                                                 current_columns = current_columns,
+                                                                 report_key_name = f"missing_columns_within_{subset}_dataset")
+
+                #Hypothesis testing for data drift
+                if columns_status:
+                    logging.info(f"Checking for data drift in {subset} dataset.")
+                    self.data_drift(base_profile = base_profile,
+                                    base_columns = base_columns,
+                                    current_profile = profile,
+                                    report_key_name = f"data_drift_within_{subset}_dataset")
+
+            return self.write_validation_report()
+
         except Exception as e:
             logging.error(APSException(e, sys))
             raise APSException(e, sys)  
\ No newline at end of file
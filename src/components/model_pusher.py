@@ -0,0 +1,85 @@
+#Importing required dependencies
+import os, sys
+#=============================================
+from src.entity import config_entity, artifact_entity
+from src.logger import logging
+from src.exception import APSException
+from src.latest_path import LatestPathFinder
+from src.artifact_store import artifact_store
+
+
+class ModelPusher:
+
+    def __init__(self,
+                 model_pusher_config: config_entity.ModelPusherConfig,
+                 data_transformation_artifact: artifact_entity.DataTransformationArtifact,
+                 model_trainer_artifact: artifact_entity.ModelTrainerArtifact):
+        try:
+            logging.info(f"{'>>'*20}  MODEL PUSHER  {'<<'*20}")
+            self.model_pusher_config = model_pusher_config
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_trainer_artifact = model_trainer_artifact
+            self.latest_path_finder = LatestPathFinder(model_registry = self.model_pusher_config.saved_model_dir)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def push_file(self, file_path: str, saved_file_path: str) -> None:
+        """
+        DESCRIPTION:
+        Copy an artifact file into the model registry. The copy goes
+        through the artifact store, so the registry file is a hardlink
+        to the content the run already stored rather than a new copy.
+        ================================================================
+        RETURN: None
+        """
+        try:
+            with open(file_path, "rb") as file_obj:
+                artifact_store.save_bytes(saved_file_path, file_obj.read())
+            logging.info(f"Pushed: {file_path} to: {saved_file_path}")
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def initiate_model_pusher(self) -> artifact_entity.ModelPusherArtifact:
+        """
+        DESCRIPTION:
+        This function saves the accepted model as the next version of the
+        model registry, together with everything later runs read from it:
+        the transformer and the target encoder, the fused inference
+        transform, and the training state, i.e. the decision threshold
+        and the number of feature store rows incremental training starts
+        from.
+        ================================================================
+        RETURN: Model pusher artifact
+        """
+        try:
+            #Every path is resolved before the first file is written, since writing creates the next version directory
+            saved_version_dir = self.latest_path_finder.get_latest_save_dir_path()
+            pushed_file_paths = [
+                (self.data_transformation_artifact.transform_object_path, self.latest_path_finder.get_latest_save_transformer_path()),
+                (self.data_transformation_artifact.target_encoder_path, self.latest_path_finder.get_latest_save_target_encoder_path()),
+                (self.model_trainer_artifact.fused_transformer_path, self.latest_path_finder.get_latest_save_fused_transformer_path()),
+            ]
+            if self.model_trainer_artifact.training_state_path is not None and os.path.exists(self.model_trainer_artifact.training_state_path):
+                pushed_file_paths.append((self.model_trainer_artifact.training_state_path,
+                                          self.latest_path_finder.get_latest_save_training_state_path()))
+            #The model is written last, so a version holding a model also holds every object it is used with
+            pushed_file_paths.append((self.model_trainer_artifact.model_path, self.latest_path_finder.get_latest_save_model_path()))
+
+            logging.info(f"Saving the model and its objects in the model registry as: {saved_version_dir}")
+            for file_path, saved_file_path in pushed_file_paths:
+                self.push_file(file_path = file_path, saved_file_path = saved_file_path)
+
+            model_pusher_artifact = artifact_entity.ModelPusherArtifact(saved_model_dir = self.model_pusher_config.saved_model_dir,
+                                                                        saved_version_dir = saved_version_dir)
+            logging.info(f"Model pusher artifact: {model_pusher_artifact}")
+            return model_pusher_artifact
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
@@ -1,34 +1,185 @@
 #Importing required dependencies
 from typing import Optional
 import os,sys
+import time
+import numpy as np
+import xgboost as xgb
 from xgboost import XGBClassifier
-from sklearn.metrics import accuracy_score, f1_score
 #==================================================
 from src.entity import config_entity, artifact_entity
 from src.logger import logging
 from src.exception import APSException
-from src import utils
+from src import utils, rebalancing, model_search, dmatrix, cross_validation, checkpoint, metrics
+from src.transformer_cache import TransformerCache
+from src.config import TARGET_COLUMN, sensor_schema
+from src.fused_transform import FusedTransformer
+from src.latest_path import LatestPathFinder
 
 class ModelTrainer:
 
     def __init__(self,
                  model_trainer_config: config_entity.ModelTrainerConfig,
-                 data_transformation_artifact: artifact_entity.DataTransformationArtifact,):
+                 data_transformation_artifact: artifact_entity.DataTransformationArtifact,
+                 data_ingestion_artifact: Optional[artifact_entity.DataIngestionArtifact] = None,):
         try:
             logging.info(f"{'>>'*20} MODEL TRAINING {'<<'*20}")
             self.model_trainer_config = model_trainer_config
             self.data_transformation_artifact = data_transformation_artifact
+            #Needed to train incrementally on the newly ingested rows and to record the training state
+            self.data_ingestion_artifact = data_ingestion_artifact
+            self.best_params = None
+            self.search_trace = None
+            self.cv_scores = None
         
         except Exception as e:
             logging.error(APSException(e, sys))
             raise APSException(e, sys)
 
 
-    def train_model(self, input_feature_train, target_feature_train):
+    def get_dmatrix(self, train_path: str, target_path: str, ref = None):
+        try:
+            return dmatrix.build_dmatrix(train_path = train_path,
+                                         target_path = target_path,
+                                         external_memory = self.model_trainer_config.external_memory,
+                                         batch_size = self.model_trainer_config.external_memory_batch_size,
+                                         max_bin = self.model_trainer_config.max_bin,
+                                         cache_dir = self.model_trainer_config.external_memory_cache_dir,
+                                         ref = ref,
+                                         mmap_mode = self.model_trainer_config.mmap_mode)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    @staticmethod
+    def predict_proba(model: XGBClassifier, dmatrix: xgb.DMatrix):
+        """
+        DESCRIPTION:
+        This function predicts the probability of the positive class of every
+        row of an XGBoost matrix, reusing its quantized features instead of
+        quantizing an array again.
+        =======================================================================
+        RETURN: array of probabilities of the positive class
+        """
+        try:
+            return model.get_booster().predict(dmatrix)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_model_params(self, target_feature_train) -> dict:
+        """
+        DESCRIPTION:
+        This function returns the hyperparameters of the XGBoost classifier:
+        the hist method, the class weight of the rebalancing strategy and, in
+        search mode, the best candidate of the hyperparameter search.
+        =======================================================================
+        RETURN: dictionary of hyperparameters
+        """
+        try:
+            params = dict(tree_method = "hist", max_bin = self.model_trainer_config.max_bin)
+            if self.data_transformation_artifact.rebalancing_strategy == "class_weight":
+                #The train dataset is not resampled, the positive class is weighted instead
+                params["scale_pos_weight"] = rebalancing.get_scale_pos_weight(target_feature_train)
+                logging.info(f"Weighting the positive class with scale_pos_weight: {params['scale_pos_weight']}")
+
+            if self.model_trainer_config.model_search:
+                logging.info("Searching the hyperparameters of the model by successive halving")
+                #The validation fold is carved out of the train dataset before resampling, only its fit fold is resampled
+                best_trial, self.search_trace = model_search.successive_halving_search(
+                    train_path = self.data_transformation_artifact.transformed_train_unbalanced_path,
+                    target_path = self.data_transformation_artifact.transformed_train_unbalanced_target_path,
+                    n_candidates = self.model_trainer_config.search_n_candidates,
+                    n_workers = self.model_trainer_config.search_n_workers,
+                    min_rounds = self.model_trainer_config.search_min_rounds,
+                    max_rounds = self.model_trainer_config.search_max_rounds,
+                    search_dir = self.model_trainer_config.search_dir,
+                    halving_factor = self.model_trainer_config.search_halving_factor,
+                    early_stopping_rounds = self.model_trainer_config.search_early_stopping_rounds,
+                    validation_size = self.model_trainer_config.search_validation_size,
+                    time_budget = self.model_trainer_config.search_time_budget,
+                    base_params = params,
+                    rebalancing_strategy = self.data_transformation_artifact.rebalancing_strategy,
+                    rebalancing_n_jobs = self.data_transformation_artifact.rebalancing_n_jobs,
+                    random_state = config_entity.RANDOM_STATE)
+                #The best candidate is refitted on the whole train dataset for the rounds it needed on the validation fold
+                self.best_params = dict(best_trial["params"], n_estimators = best_trial["best_iteration"] + 1)
+                logging.info(f"Best hyperparameters: {self.best_params}")
+                params.update(self.best_params)
+            return params
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_train_paths(self) -> tuple:
+        """
+        DESCRIPTION:
+        This function returns the train dataset the model is trained on from
+        scratch: the one of the data transformation or, when the data
+        transformation deferred the resampling, see DataTransformation, the
+        train dataset before resampling resampled here with the rebalancing
+        strategy of the run. A warm start never needs it.
+        =======================================================================
+        RETURN: Tuple: paths of the input features and of the encoded target
+        """
+        try:
+            if not self.data_transformation_artifact.resampling_deferred:
+                return (self.data_transformation_artifact.transformed_train_path,
+                        self.data_transformation_artifact.transformed_train_target_path)
+            input_feature_train_arr, target_feature_train_arr = rebalancing.rebalance(
+                X = utils.load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_train_unbalanced_path),
+                y = utils.load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_train_unbalanced_target_path),
+                strategy = self.data_transformation_artifact.rebalancing_strategy,
+                n_jobs = self.data_transformation_artifact.rebalancing_n_jobs,
+                random_state = config_entity.RANDOM_STATE)
+            utils.save_numpy_array_data(file_path = self.model_trainer_config.resampled_train_path,
+                                        array = input_feature_train_arr)
+            utils.save_numpy_array_data(file_path = self.model_trainer_config.resampled_train_target_path,
+                                        array = target_feature_train_arr)
+            return self.model_trainer_config.resampled_train_path, self.model_trainer_config.resampled_train_target_path
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def train_model(self, dtrain: xgb.DMatrix, params: dict, train_path: str, target_path: str) -> XGBClassifier:
         try:
             logging.info("Creating instance of XG-boost Classifier")
-            xgb_clf = XGBClassifier()
-            xgb_clf.fit(input_feature_train, target_feature_train)
+            #The booster is trained on the prebuilt matrix with the parameters of the classifier, then loaded into it
+            xgb_clf = XGBClassifier(**params)
+            booster_params = xgb_clf.get_xgb_params()
+            num_boost_round = xgb_clf.n_estimators or 100
+
+            #Checkpoints of a run are kept apart per configuration and per training data, i.e. the transformed train
+            #dataset and the transformer, so a resumed run only continues the same training on the same data
+            callbacks, saved_booster = [], None
+            if self.model_trainer_config.checkpoint_interval > 0:
+                checkpoint_key = TransformerCache.get_key(
+                    sorted(booster_params.items()),
+                    num_boost_round,
+                    utils.get_file_hash(file_path = train_path),
+                    utils.get_file_hash(file_path = target_path),
+                    utils.get_file_hash(file_path = self.data_transformation_artifact.transform_object_path))
+                checkpoint_dir = os.path.join(self.model_trainer_config.checkpoint_dir, checkpoint_key[:16])
+                saved_booster = checkpoint.load_latest_checkpoint(checkpoint_dir = checkpoint_dir)
+                callbacks.append(checkpoint.BoosterCheckpoint(checkpoint_dir = checkpoint_dir,
+                                                              interval = self.model_trainer_config.checkpoint_interval))
+            n_saved_rounds = saved_booster.num_boosted_rounds() if saved_booster is not None else 0
+
+            start_time = time.perf_counter()
+            booster = xgb.train(params = booster_params,
+                                dtrain = dtrain,
+                                num_boost_round = max(num_boost_round - n_saved_rounds, 0),
+                                xgb_model = saved_booster,
+                                callbacks = callbacks)
+            logging.info(f"Model trained in {time.perf_counter() - start_time:.3f} seconds.")
+            xgb_clf.load_model(bytearray(booster.save_raw(raw_format="json")))
             return xgb_clf
 
         except Exception as e:
@@ -36,44 +187,259 @@ class ModelTrainer:
             raise APSException(e, sys)
             
 
+    def is_transformer_compatible(self, saved_transformer, current_transformer, saved_model: XGBClassifier) -> bool:
+        """
+        DESCRIPTION:
+        This function checks that a saved model, which keeps boosting on data
+        transformed by its own saved transformer, can be evaluated and
+        deployed with the current transformer: both transformers must use the
+        same features in the same order as the model, their robust scaler
+        scales must match within the relative tolerance of the configuration,
+        and their centers within that tolerance in units of the saved scale,
+        so that centers close to zero are compared on the scale of the data.
+        =======================================================================
+        RETURN: True if the current transformer is compatible
+        """
+        try:
+            saved_features = list(saved_transformer.feature_names_in_)
+            if saved_features != list(current_transformer.feature_names_in_):
+                logging.info("Features of the saved and the current transformer differ.")
+                return False
+            if saved_model.n_features_in_ != len(saved_features):
+                logging.info("Features of the saved model and the transformers differ.")
+                return False
+            rtol = self.model_trainer_config.incremental_transformer_rtol
+            saved_scaler = saved_transformer.named_steps["RobustScaler"]
+            current_scaler = current_transformer.named_steps["RobustScaler"]
+            saved_scale = np.abs(saved_scaler.scale_)
+            if not np.all(np.abs(current_scaler.scale_ - saved_scaler.scale_) <= rtol * saved_scale):
+                logging.info(f"Robust scaler scale_ of the saved and the current transformer differ by more than {rtol}.")
+                return False
+            if not np.all(np.abs(current_scaler.center_ - saved_scaler.center_) <= rtol * saved_scale):
+                logging.info(f"Robust scaler center_ of the saved and the current transformer differ by more than {rtol} times the scale.")
+                return False
+            return True
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_incremental_base_model(self):
+        """
+        DESCRIPTION:
+        This function loads the latest model of the registry, its transformer,
+        the number of feature store rows it was trained on and its decision
+        threshold, if it can keep boosting and then be used with the current
+        transformer. Rows past the trained ones are only new rows in the
+        persistent feature store of the "incremental" ingestion mode, so in
+        any other mode the model is trained from scratch.
+        =======================================================================
+        RETURN: Tuple of the model, its transformer, its number of trained rows
+        and its decision threshold, or None
+        """
+        try:
+            if self.data_ingestion_artifact is None or self.data_ingestion_artifact.ingestion_mode != "incremental":
+                logging.info("Feature store is not ingested incrementally, training from scratch.")
+                return None
+            latest_path_finder = LatestPathFinder()
+            if latest_path_finder.get_latest_dir_path() is None:
+                logging.info("No model in the registry, training from scratch.")
+                return None
+            training_state_path = latest_path_finder.get_latest_training_state_path()
+            if not os.path.exists(training_state_path):
+                logging.info("Training state of the latest model is not available, training from scratch.")
+                return None
+
+            saved_model = utils.load_object(file_path = latest_path_finder.get_latest_model_path())
+            saved_transformer = utils.load_object(file_path = latest_path_finder.get_latest_transformer_path())
+            current_transformer = utils.load_object(file_path = self.data_transformation_artifact.transform_object_path)
+            if not self.is_transformer_compatible(saved_transformer = saved_transformer,
+                                                  current_transformer = current_transformer,
+                                                  saved_model = saved_model):
+                logging.info("Latest model is not compatible with the current transformer, training from scratch.")
+                return None
+            training_state = utils.read_yaml_file(file_path = training_state_path)
+            if training_state.get("n_feature_store_rows") is None:
+                logging.info("Number of feature store rows of the latest model is not available, training from scratch.")
+                return None
+            n_trained_rows = int(training_state["n_feature_store_rows"])
+            #Models saved without a decision threshold predict at the default threshold of 0.5 of XGBoost
+            decision_threshold = float(training_state.get("decision_threshold", 0.5))
+            return saved_model, saved_transformer, n_trained_rows, decision_threshold
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def train_incremental_model(self, saved_model: XGBClassifier, saved_transformer, n_trained_rows: int) -> tuple:
+        """
+        DESCRIPTION:
+        This function continues boosting the saved model for the configured
+        number of rounds on the train rows ingested after the first
+        `n_trained_rows` rows of the feature store. Only the new rows are read
+        and transformed, with the saved transformer the model was trained
+        with, so the time spent scales with the new data. The new rows are
+        rebalanced with the rebalancing strategy of the run: resampled, or
+        weighted through scale_pos_weight.
+        =======================================================================
+        RETURN: Tuple: model with the new trees appended, input features and
+        encoded target of the new train rows before rebalancing
+        """
+        try:
+            transformer = saved_transformer
+            target_encoder = utils.load_object(file_path = self.data_transformation_artifact.target_encoder_path)
+            input_feature_chunks, target_feature_chunks = [], []
+            for chunk in utils.iter_split(feature_store_file_path = self.data_ingestion_artifact.feature_store_file_path,
+                                          split_file_path = self.data_ingestion_artifact.split_file_path,
+                                          subset = "train",
+                                          batch_size = self.model_trainer_config.external_memory_batch_size,
+                                          schema = sensor_schema,
+                                          start_row = n_trained_rows):
+                input_feature_chunks.append(transformer.transform(chunk.drop(TARGET_COLUMN, axis=1))
+                                            .astype(sensor_schema.feature_dtype, copy=False))
+                target_feature_chunks.append(target_encoder.transform(chunk[TARGET_COLUMN]))
+            n_new_rows = sum(len(target_feature) for target_feature in target_feature_chunks)
+            if n_new_rows == 0:
+                logging.info("No train rows were ingested since the latest model was trained, keeping it as is.")
+                return (saved_model,
+                        np.empty((0, len(transformer.feature_names_in_)), dtype=sensor_schema.feature_dtype),
+                        np.empty(0, dtype=config_entity.TARGET_DTYPE))
+
+            input_feature_new = np.concatenate(input_feature_chunks)
+            target_feature_new = np.concatenate(target_feature_chunks).astype(config_entity.TARGET_DTYPE)
+            input_feature_unbalanced, target_feature_unbalanced = input_feature_new, target_feature_new
+            params = saved_model.get_xgb_params()
+            params["scale_pos_weight"] = 1.0
+            rebalancing_strategy = self.data_transformation_artifact.rebalancing_strategy
+            n_positive_rows = int(np.sum(target_feature_new == 1))
+            if rebalancing.is_resampling(rebalancing_strategy) and n_positive_rows <= rebalancing.SMOTE_K_NEIGHBORS:
+                logging.info(f"Only {n_positive_rows} positive new rows, too few to resample, weighting the positive class instead.")
+                rebalancing_strategy = "class_weight"
+            if rebalancing.is_resampling(rebalancing_strategy):
+                input_feature_new, target_feature_new = rebalancing.rebalance(X = input_feature_new,
+                                                                              y = target_feature_new,
+                                                                              strategy = rebalancing_strategy,
+                                                                              n_jobs = self.data_transformation_artifact.rebalancing_n_jobs,
+                                                                              random_state = config_entity.RANDOM_STATE)
+            elif rebalancing_strategy == "class_weight":
+                params["scale_pos_weight"] = rebalancing.get_scale_pos_weight(target_feature_new)
+                logging.info(f"Weighting the positive class of the new rows with scale_pos_weight: {params['scale_pos_weight']}")
+
+            logging.info(f"Boosting the latest model for {self.model_trainer_config.incremental_rounds} more rounds on {n_new_rows} new rows.")
+            dnew = xgb.QuantileDMatrix(input_feature_new,
+                                       label = target_feature_new,
+                                       max_bin = self.model_trainer_config.max_bin)
+            start_time = time.perf_counter()
+            booster = xgb.train(params = params,
+                                dtrain = dnew,
+                                num_boost_round = self.model_trainer_config.incremental_rounds,
+                                xgb_model = saved_model.get_booster())
+            logging.info(f"Model trained incrementally in {time.perf_counter() - start_time:.3f} seconds.")
+            model = XGBClassifier(**saved_model.get_params())
+            model.load_model(bytearray(booster.save_raw(raw_format="json")))
+            return model, input_feature_unbalanced, target_feature_unbalanced
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
     def initiate_model_trainer(self,) -> artifact_entity.ModelTrainerArtifact:
         try:
             #Loading Dataset
-            logging.info("Loading training dataset")
-            train_arr = utils.load_numpy_array_data(file_path= self.data_transformation_artifact.transformed_train_path)
-            logging.info("Loading test dataset")
-            test_arr = utils.load_numpy_array_data(file_path= self.data_transformation_artifact.transformed_test_path)
-
-            #Splitting the dataset into input features and target column
-            logging.info("Splitting training dataset into X_train, y_train")
-            X_train, y_train = train_arr[ : , :-1], train_arr[ : , -1]
-            logging.info("Splitting test dataset into X_test, y_test")
-            X_test, y_test = test_arr[ : , :-1], test_arr[ : , -1]
+            #Input features and target column are stored apart as contiguous arrays, in the feature dtype of the sensor
+            #schema and the target dtype. They are memory-mapped, so XGBoost reads them without any copy.
+            mmap_mode = self.model_trainer_config.mmap_mode
+            logging.info("Loading target column of test dataset into y_test")
+            y_test = utils.load_numpy_array_data(file_path= self.data_transformation_artifact.transformed_test_target_path, mmap_mode= mmap_mode)
 
             #Training the model
-            logging.info("Training the model on training dataset")
-            model = self.train_model(input_feature_train = X_train,
-                                     target_feature_train = y_train)
+            incremental_base_model = None
+            if self.model_trainer_config.incremental_training:
+                logging.info("Looking for the latest model of the registry to train incrementally")
+                incremental_base_model = self.get_incremental_base_model()
+
+            if incremental_base_model is not None:
+                #Warm start: only the new train rows are read, transformed and quantized, the train dataset is never loaded
+                saved_model, saved_transformer, n_trained_rows, decision_threshold = incremental_base_model
+                model, input_feature_new, target_feature_new = self.train_incremental_model(saved_model = saved_model,
+                                                                                            saved_transformer = saved_transformer,
+                                                                                            n_trained_rows = n_trained_rows)
+                #The decision threshold of the latest model is kept, it was chosen on far more rows than the new ones
+                logging.info(f"Decision threshold of the latest model: {decision_threshold}")
+                logging.info("Applying model prediction on the new rows of training dataset.")
+                y_train_unbalanced = target_feature_new
+                y_train_prob = ModelTrainer.predict_proba(model = model, dmatrix = xgb.DMatrix(input_feature_new))
+                #The test dataset is only predicted, so it is not quantized
+                dtest = xgb.DMatrix(utils.load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_test_path,
+                                                                mmap_mode = mmap_mode))
+
+            else:
+                train_path, target_path = self.get_train_paths()
+                logging.info("Loading target column of training dataset into y_train")
+                y_train = utils.load_numpy_array_data(file_path= target_path, mmap_mode= mmap_mode)
+
+                #The input features are quantized once into XGBoost matrices, reused for training and prediction
+                logging.info("Building XGBoost matrix of training dataset")
+                dtrain = self.get_dmatrix(train_path = train_path,
+                                          target_path = target_path)
+                logging.info("Building XGBoost matrix of test dataset with the quantile cuts of training dataset")
+                dtest = self.get_dmatrix(train_path = self.data_transformation_artifact.transformed_test_path,
+                                         target_path = self.data_transformation_artifact.transformed_test_target_path,
+                                         ref = dtrain)
+
+                params = self.get_model_params(target_feature_train = y_train)
+                if self.model_trainer_config.cross_validation:
+                    logging.info(f"Cross-validating the model on {self.model_trainer_config.cv_n_folds} folds of training dataset")
+                    #The folds are drawn from the train dataset before resampling and are resampled one by one
+                    self.cv_scores = cross_validation.cross_validate(
+                        train_path = self.data_transformation_artifact.transformed_train_unbalanced_path,
+                        target_path = self.data_transformation_artifact.transformed_train_unbalanced_target_path,
+                        params = params,
+                        n_folds = self.model_trainer_config.cv_n_folds,
+                        n_workers = self.model_trainer_config.cv_n_workers,
+                        rebalancing_strategy = self.data_transformation_artifact.rebalancing_strategy,
+                        random_state = config_entity.RANDOM_STATE)
+                logging.info("Training the model on training dataset")
+                model = self.train_model(dtrain = dtrain,
+                                         params = params,
+                                         train_path = train_path,
+                                         target_path = target_path)
+
+                #The decision threshold is chosen on the training rows before resampling, whose class distribution is the
+                #real one, then every prediction is turned into a label with it
+                logging.info("Applying model prediction on training dataset before resampling.")
+                y_train_unbalanced = y_train
+                dtrain_unbalanced = dtrain
+                if train_path != self.data_transformation_artifact.transformed_train_unbalanced_path:
+                    y_train_unbalanced = utils.load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_train_unbalanced_target_path,
+                                                                     mmap_mode = mmap_mode)
+                    dtrain_unbalanced = self.get_dmatrix(train_path = self.data_transformation_artifact.transformed_train_unbalanced_path,
+                                                         target_path = self.data_transformation_artifact.transformed_train_unbalanced_target_path,
+                                                         ref = dtrain)
+                y_train_prob = ModelTrainer.predict_proba(model = model, dmatrix = dtrain_unbalanced)
+
+                #Decision threshold with the lowest APS cost on training dataset, from one sweep over the sorted probabilities
+                decision_threshold, _ = metrics.get_best_threshold(y_true = y_train_unbalanced, y_prob = y_train_prob, metric = "cost")
+                logging.info(f"Decision threshold with the lowest APS cost on training dataset: {decision_threshold}")
 
             #Applying model prediction and evaluating scores
-            #For training dataset
-            logging.info("Applying model prediction on training dataset.")
-            y_train_ped = model.predict(X_train)
-            acc_train_score = accuracy_score(y_true = y_train,
-                                             y_pred = y_train_ped)
-            logging.info(f"Accuracy of model for training dataset: {acc_train_score}")
-            f1_train_score = f1_score(y_true = y_train,
-                                      y_pred = y_train_ped)
-            logging.info(f"F1-score of model for training dataset: {f1_train_score}")
+            #Every score is derived from one confusion matrix per dataset, at the decision threshold
+            #For training dataset, or its new rows when the model was trained incrementally
+            train_metrics = metrics.classification_metrics(y_true = y_train_unbalanced, y_pred = y_train_prob >= decision_threshold)
+            acc_train_score, f1_train_score = train_metrics["accuracy"], train_metrics["f1_score"]
+            logging.info(f"Metrics of model for training dataset: {train_metrics}")
             #For test dataset
-            logging.info("Applying model prediction on training dataset.")
-            y_test_ped = model.predict(X_test)
-            acc_test_score = accuracy_score(y_true = y_test,
-                                             y_pred = y_test_ped)
-            logging.info(f"Accuracy of model for training dataset: {acc_test_score}")
-            f1_test_score = f1_score(y_true = y_test,
-                                      y_pred = y_test_ped)
-            logging.info(f"F1-score of model for test dataset: {f1_test_score}")
+            logging.info("Applying model prediction on test dataset.")
+            y_test_prob = ModelTrainer.predict_proba(model = model, dmatrix = dtest)
+            test_metrics = metrics.classification_metrics(y_true = y_test, y_pred = y_test_prob >= decision_threshold)
+            acc_test_score, f1_test_score = test_metrics["accuracy"], test_metrics["f1_score"]
+            logging.info(f"Metrics of model for test dataset: {test_metrics}")
+            default_test_metrics = metrics.classification_metrics(y_true = y_test, y_pred = y_test_prob > 0.5)
+            logging.info(f"APS cost on test dataset: {test_metrics['cost']} at the decision threshold, "
+                         f"{default_test_metrics['cost']} at the default threshold of 0.5")
 
             #Checking if the model is either underfitting or overfitting
             logging.info("Checking if the model is underfitting or not")
@@ -82,6 +448,12 @@ class ModelTrainer:
                              leaas than {self.model_trainer_config.expected_score}.")
                 raise Exception(f"Trained model is not good, since its accuracy: {acc_test_score} is \
                                 leaas than {self.model_trainer_config.expected_score}.")
+            if self.cv_scores is not None:
+                cv_f1_score = float(np.mean([fold_score["f1_score"] for fold_score in self.cv_scores]))
+                logging.info(f"Mean F1-score of model across the cross-validation folds: {cv_f1_score}")
+                if cv_f1_score < self.model_trainer_config.expected_score:
+                    raise Exception(f"Trained model is not good, since its mean cross-validation F1-score: {cv_f1_score} is \
+                                    less than {self.model_trainer_config.expected_score}.")
             logging.info("Model is not underfitting.")
 
             logging.info("Checking for overfitting")
@@ -94,14 +466,38 @@ class ModelTrainer:
             logging.info("Saving the model as an object")
             utils.save_object(file_path = self.model_trainer_config.model_path,
                               obj = model)
+
+            #Saving the fused inference transform next to the model
+            logging.info("Compiling the fitted transformer into a fused inference transform")
+            fused_transformer = FusedTransformer.from_pipeline(
+                pipeline = utils.load_object(file_path = self.data_transformation_artifact.transform_object_path),
+                dtype = sensor_schema.feature_dtype)
+            utils.save_object(file_path = self.model_trainer_config.fused_transformer_path,
+                              obj = fused_transformer)
+
+            #Saving the decision threshold of the model and the number of feature store rows it was trained on,
+            #the starting point of incremental training
+            training_state = {"decision_threshold": decision_threshold}
+            if self.data_ingestion_artifact is not None:
+                training_state["n_feature_store_rows"] = len(np.load(self.data_ingestion_artifact.split_file_path, mmap_mode="r"))
+            utils.write_yaml_file(file_path = self.model_trainer_config.training_state_path,
+                                  data = training_state)
             
             #Creating artifact for Model trainer
             model_trainer_artifact = artifact_entity.ModelTrainerArtifact(
                 model_path = self.model_trainer_config.model_path,
+                fused_transformer_path = self.model_trainer_config.fused_transformer_path,
                 acc_train_score = acc_train_score,
                 acc_test_score = acc_test_score,
                 f1_train_score = f1_train_score,
-                f1_test_score = f1_test_score)
+                f1_test_score = f1_test_score,
+                cost_train_score = train_metrics["cost"],
+                cost_test_score = test_metrics["cost"],
+                decision_threshold = decision_threshold,
+                training_state_path = self.model_trainer_config.training_state_path,
+                best_params = self.best_params,
+                search_trace = self.search_trace,
+                cv_scores = self.cv_scores)
 
             #Output of Model Trainer is ready
             return model_trainer_artifact
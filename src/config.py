@@ -12,4 +12,25 @@ class EnvironmentVariable:
 
 env_var = EnvironmentVariable()
 mongo_client = pymongo.MongoClient(env_var.mongo_db_url)
-TARGET_COLUMN = "class"
\ No newline at end of file
+TARGET_COLUMN = "class"
+
+
+@dataclass
+class SensorSchema:
+    """
+    Declared schema of the APS sensor table: the target column is categorical,
+    every other column is a numeric feature of {feature_dtype} and any of the
+    {na_values} tokens is a missing value.
+    """
+    target_column: str = TARGET_COLUMN
+    target_categories: tuple = ("neg", "pos")
+    feature_dtype: str = "float32"
+    na_values: tuple = ("na",)
+
+    def get_dtype(self, column: str):
+        if column == self.target_column:
+            return pd.CategoricalDtype(categories=list(self.target_categories))
+        return self.feature_dtype
+
+
+sensor_schema = SensorSchema()
@@ -0,0 +1,110 @@
+#Importing required dependencies
+import os, sys
+import time
+import numpy as np
+import xgboost as xgb
+from concurrent.futures import ProcessPoolExecutor
+from xgboost import XGBClassifier
+from sklearn.model_selection import StratifiedKFold
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+from src import metrics, rebalancing
+
+
+def fit_fold(train_path: str, target_path: str, fold: int, fit_index: np.ndarray, val_index: np.ndarray,
+             params: dict, n_jobs: int, rebalancing_strategy: str = "none", random_state = None) -> dict:
+    """
+    DESCRIPTION:
+        This function runs in a worker process. It memory-maps the transformed
+        train dataset before resampling, so every worker reads the same pages
+        of the page cache instead of receiving a pickled copy, fits the model
+        on the training folds and scores it on the held out fold. With a
+        resampling strategy, only the training folds are resampled, so no
+        synthetic row is interpolated from the held out fold. Otherwise the
+        model is fitted on the memory map itself, the rows of the held out
+        fold being given a weight of 0, without copying the training folds.
+    ====================================================================================
+    RETURN:
+        Dictionary: fold, accuracy, F1-score, APS cost and fit time
+    """
+    try:
+        X = np.load(train_path, mmap_mode="r")
+        y = np.load(target_path, mmap_mode="r")
+        start_time = time.perf_counter()
+        xgb_clf = XGBClassifier(**params, n_jobs = n_jobs)
+        booster_params = xgb_clf.get_xgb_params()
+        max_bin = booster_params.get("max_bin") or 256
+        if rebalancing.is_resampling(rebalancing_strategy):
+            X_fit, y_fit = rebalancing.rebalance(X = X[fit_index],
+                                                 y = y[fit_index],
+                                                 strategy = rebalancing_strategy,
+                                                 n_jobs = n_jobs,
+                                                 random_state = random_state)
+            dfit = xgb.QuantileDMatrix(X_fit, label = y_fit, max_bin = max_bin)
+        else:
+            weight = np.zeros(len(y), dtype=np.float32)
+            weight[fit_index] = 1
+            dfit = xgb.QuantileDMatrix(X, label = y, weight = weight, max_bin = max_bin)
+        booster = xgb.train(params = booster_params, dtrain = dfit, num_boost_round = xgb_clf.n_estimators or 100)
+        fit_time = time.perf_counter() - start_time
+        if rebalancing.is_resampling(rebalancing_strategy):
+            y_prob = booster.inplace_predict(X[val_index])
+        else:
+            y_prob = booster.predict(dfit)[val_index]
+        fold_metrics = metrics.classification_metrics(y_true = y[val_index], y_pred = y_prob > 0.5)
+        return {"fold": fold,
+                "accuracy": fold_metrics["accuracy"],
+                "f1_score": fold_metrics["f1_score"],
+                "cost": fold_metrics["cost"],
+                "fit_time": fit_time}
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def cross_validate(train_path: str, target_path: str, params: dict, n_folds: int = 5, n_workers = None,
+                   rebalancing_strategy: str = "none", random_state = None) -> list:
+    """
+    DESCRIPTION:
+        This function runs a stratified k-fold cross-validation of an XGBoost
+        configuration with the folds fitted concurrently by worker processes.
+        The folds are drawn from the train dataset before resampling, and the
+        rebalancing strategy is applied within every fold, see fit_fold.
+        The cores are split between the two levels of parallelism: `n_workers`
+        folds run at once, each with an equal share of the cores as `n_jobs`.
+    ====================================================================================
+    PARAMETERS:
+        train_path: location of the transformed input features before resampling in .npy format
+        target_path: location of the encoded target column before resampling in .npy format
+        params: hyperparameters of the XGBoost classifier
+        n_folds: number of folds
+        n_workers: number of worker processes, one per fold up to the number of cores if None
+        rebalancing_strategy: strategy applied to the training folds, see src.rebalancing
+        random_state: seed of the folds and of the resampling
+    ====================================================================================
+    RETURN:
+        List of the metrics of every fold, see fit_fold
+    """
+    try:
+        start_time = time.perf_counter()
+        n_cores = os.cpu_count() or 1
+        n_workers = n_workers or min(n_folds, n_cores)
+        n_jobs = max(1, n_cores // n_workers)
+        y = np.load(target_path, mmap_mode="r")
+        folds = StratifiedKFold(n_splits = n_folds, shuffle = True, random_state = random_state).split(np.zeros(len(y)), y)
+        logging.info(f"Cross-validating {n_folds} folds with {n_workers} workers of {n_jobs} threads.")
+        with ProcessPoolExecutor(max_workers = n_workers) as executor:
+            futures = [executor.submit(fit_fold, train_path, target_path, fold, fit_index, val_index, params, n_jobs,
+                                       rebalancing_strategy, random_state)
+                       for fold, (fit_index, val_index) in enumerate(folds)]
+            fold_scores = [future.result() for future in futures]
+        for fold_score in fold_scores:
+            logging.info(f"Fold {fold_score['fold']}: {fold_score}")
+        logging.info(f"Cross-validation took {time.perf_counter() - start_time:.3f} seconds.")
+        return fold_scores
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
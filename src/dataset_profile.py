@@ -0,0 +1,191 @@
+#Importing required dependencies
+import os, sys
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+from src import utils
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Per-column summary of a dataset holding everything the validation checks
+    need: the column list, the fraction of missing values of every column, the
+    columns that can be coerced to numbers and their sorted non-NaN values.
+    The sorted values of all numeric columns are kept in one array, column j
+    being values[offsets[j]:offsets[j+1]].
+    """
+    columns: list
+    null_fraction: np.ndarray
+    numeric_columns: list
+    values: np.ndarray
+    offsets: np.ndarray
+    n_rows: int
+    source_hash: str = ""
+
+    def get_null_fraction(self) -> pd.Series:
+        return pd.Series(self.null_fraction, index=self.columns)
+
+    def get_sorted_values(self, column: str) -> np.ndarray:
+        j = self.numeric_columns.index(column)
+        return self.values[self.offsets[j]:self.offsets[j + 1]]
+
+    def get_values_array(self, columns: list) -> np.ndarray:
+        """
+        Return the sorted values of the given numeric columns as a 2-D float64
+        array, padded with NaN to the length of the longest column.
+        """
+        sorted_values = [self.get_sorted_values(column) for column in columns]
+        n_max = max((len(column_values) for column_values in sorted_values), default=0)
+        values_arr = np.full((n_max, len(columns)), np.nan)
+        for j, column_values in enumerate(sorted_values):
+            values_arr[:len(column_values), j] = column_values
+        return values_arr
+
+
+def build_dataset_profile(df: pd.DataFrame, source_hash: str = "") -> DatasetProfile:
+    """
+    DESCRIPTION:
+    This function builds the profile of a dataset in a single pass over its
+    columns. Each column is converted to a float32 array once, if it can be
+    coerced to a number, and that array yields its missing values fraction
+    and its sorted non-NaN values. Columns that cannot be coerced, like the
+    categorical target, only get their missing values fraction.
+    ==========================================================================
+    PARAMETERS:
+    df: Pandas DataFrame to be profiled
+    source_hash: hash of the file the dataset was read from
+    ==========================================================================
+    RETURN: DatasetProfile of the dataset
+    """
+    try:
+        null_fraction = np.zeros(df.shape[1], dtype=np.float64)
+        numeric_columns, sorted_values = [], []
+        for j, column in enumerate(df.columns):
+            series = df[column]
+            column_values = None
+            if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+                column_values = series.to_numpy(dtype=np.float32, na_value=np.nan)
+            elif pd.api.types.is_object_dtype(series.dtype):
+                try:
+                    column_values = pd.to_numeric(series).to_numpy(dtype=np.float32, na_value=np.nan)
+                except (ValueError, TypeError):
+                    logging.info(f"Column: {column} cannot be coerced to a number.")
+
+            if column_values is None:
+                null_fraction[j] = series.isna().sum() / max(df.shape[0], 1)
+                continue
+            is_null = np.isnan(column_values)
+            null_fraction[j] = is_null.sum() / max(df.shape[0], 1)
+            numeric_columns.append(column)
+            sorted_values.append(np.sort(column_values[~is_null]))
+
+        offsets = np.zeros(len(sorted_values) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(column_values) for column_values in sorted_values])
+        return DatasetProfile(columns = list(df.columns),
+                              null_fraction = null_fraction,
+                              numeric_columns = numeric_columns,
+                              values = np.concatenate(sorted_values) if sorted_values else np.empty(0, dtype=np.float32),
+                              offsets = offsets,
+                              n_rows = df.shape[0],
+                              source_hash = source_hash)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def save_dataset_profile(file_path: str, profile: DatasetProfile) -> None:
+    """
+    DESCRIPTION:
+    This function saves a DatasetProfile as an uncompressed .npz file. The
+    file is written under a temporary name and renamed, so a reader never
+    sees a partially written profile.
+    ==========================================================================
+    PARAMETERS:
+    file_path: location of the profile in .npz format
+    profile: DatasetProfile to be saved
+    ==========================================================================
+    RETURN: None
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        temp_file_path = f"{file_path}.tmp"
+        with open(temp_file_path, "wb") as file_obj:
+            np.savez(file_obj,
+                     columns = np.array(profile.columns, dtype=str),
+                     null_fraction = profile.null_fraction,
+                     numeric_columns = np.array(profile.numeric_columns, dtype=str),
+                     values = profile.values,
+                     offsets = profile.offsets,
+                     n_rows = np.array(profile.n_rows),
+                     source_hash = np.array(profile.source_hash))
+        os.replace(temp_file_path, file_path)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def load_dataset_profile(file_path: str) -> DatasetProfile:
+    """
+    DESCRIPTION:
+    This function loads a DatasetProfile saved by save_dataset_profile.
+    ==========================================================================
+    PARAMETERS:
+    file_path: location of the profile in .npz format
+    ==========================================================================
+    RETURN: DatasetProfile
+    """
+    try:
+        with np.load(file_path, allow_pickle=False) as profile_file:
+            return DatasetProfile(columns = profile_file["columns"].tolist(),
+                                  null_fraction = profile_file["null_fraction"],
+                                  numeric_columns = profile_file["numeric_columns"].tolist(),
+                                  values = profile_file["values"],
+                                  offsets = profile_file["offsets"],
+                                  n_rows = int(profile_file["n_rows"]),
+                                  source_hash = str(profile_file["source_hash"]))
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_base_profile(base_file_path: str, profile_file_path: str, schema = None) -> DatasetProfile:
+    """
+    DESCRIPTION:
+    This function returns the profile of the base dataset. The persisted
+    profile is used as long as it was built from a base file with the same
+    hash, otherwise the base file is read once and the profile is rebuilt.
+    ==========================================================================
+    PARAMETERS:
+    base_file_path: location of the base dataset
+    profile_file_path: location of the persisted profile in .npz format
+    schema: optional schema used to read the base dataset
+    ==========================================================================
+    RETURN: DatasetProfile of the base dataset
+    """
+    try:
+        base_file_hash = utils.get_file_hash(file_path = base_file_path)
+        if os.path.exists(profile_file_path):
+            profile = load_dataset_profile(file_path = profile_file_path)
+            if profile.source_hash == base_file_hash:
+                logging.info(f"Using the persisted profile of the base dataset: {profile_file_path}")
+                return profile
+            logging.info("Base dataset has changed since its profile was built.")
+
+        logging.info(f"Building the profile of the base dataset: {base_file_path}")
+        base_df = utils.load_dataframe(file_path = base_file_path, schema = schema)
+        profile = build_dataset_profile(df = base_df, source_hash = base_file_hash)
+        save_dataset_profile(file_path = profile_file_path, profile = profile)
+        return profile
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
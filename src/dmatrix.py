@@ -0,0 +1,84 @@
+#Importing required dependencies
+import os, sys
+import numpy as np
+import xgboost as xgb
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+from src import utils
+
+
+class NumpyChunkIterator(xgb.DataIter):
+    """
+    DESCRIPTION:
+    Iterates over a transformed dataset on disk in chunks of `batch_size`
+    rows. The .npy files are memory-mapped, so only the current chunk is
+    read, and XGBoost pages the quantized chunks to `cache_prefix`.
+    """
+
+    def __init__(self, train_path: str, target_path: str, batch_size: int, cache_prefix: str):
+        try:
+            self.X = np.load(train_path, mmap_mode="r")
+            self.y = np.load(target_path, mmap_mode="r")
+            self.batch_size = batch_size
+            self.offset = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def next(self, input_data) -> int:
+        if self.offset >= self.X.shape[0]:
+            return 0
+        stop = self.offset + self.batch_size
+        input_data(data=np.ascontiguousarray(self.X[self.offset:stop]), label=np.asarray(self.y[self.offset:stop]))
+        self.offset = stop
+        return 1
+
+    def reset(self) -> None:
+        self.offset = 0
+
+
+def build_dmatrix(train_path: str, target_path: str, external_memory: bool = False, batch_size: int = 100000,
+                  max_bin: int = 256, cache_dir = None, ref = None, mmap_mode = "r"):
+    """
+    DESCRIPTION:
+        This function builds the XGBoost matrix of a transformed dataset once,
+        so that its features are quantized once and the matrix is reused for
+        training and prediction. In memory, it is a QuantileDMatrix of the
+        memory-mapped arrays; a matrix of another dataset passed as `ref`
+        shares its quantile cuts. In external memory, the dataset is read
+        in chunks of `batch_size` rows and cached on disk under `cache_dir`.
+    ====================================================================================
+    PARAMETERS:
+        train_path: location of the transformed input features in .npy format
+        target_path: location of the encoded target column in .npy format
+        external_memory: whether the dataset is read in chunks instead of loaded
+        batch_size: number of rows per chunk in external memory
+        max_bin: number of quantile bins per feature of the hist method
+        cache_dir: directory of the external memory cache
+        ref: matrix of the train dataset, whose quantile cuts are reused
+        mmap_mode: mode of the memory maps of the arrays in memory, None reads them into memory
+    ====================================================================================
+    RETURN:
+        xgboost.QuantileDMatrix or xgboost.DMatrix
+    """
+    try:
+        if external_memory:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_prefix = os.path.join(cache_dir, os.path.splitext(os.path.basename(train_path))[0])
+            logging.info(f"Building external memory DMatrix of: {train_path} in chunks of {batch_size} rows.")
+            return xgb.DMatrix(NumpyChunkIterator(train_path = train_path,
+                                                  target_path = target_path,
+                                                  batch_size = batch_size,
+                                                  cache_prefix = cache_prefix))
+        logging.info(f"Building QuantileDMatrix of: {train_path}")
+        return xgb.QuantileDMatrix(utils.load_numpy_array_data(file_path = train_path, mmap_mode = mmap_mode),
+                                   label = utils.load_numpy_array_data(file_path = target_path, mmap_mode = mmap_mode),
+                                   max_bin = max_bin,
+                                   ref = ref)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
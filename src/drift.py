@@ -0,0 +1,292 @@
+#Importing required dependencies
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from scipy.stats import ks_2samp, kstwo, wasserstein_distance
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+
+
+#Largest sample size for which scipy's ks_2samp uses the exact distribution in "auto" mode
+KS_EXACT_MAX_N = 10000
+
+#Number of base quantile bins and floor of the bin shares used by the PSI
+PSI_N_BINS = 10
+PSI_EPSILON = 1e-4
+
+DRIFT_METRICS = ("ks", "psi", "wasserstein")
+
+
+def ks_statistic_columns(base_arr: np.ndarray, current_arr: np.ndarray):
+    """
+    DESCRIPTION:
+        This function computes the two-sample KS statistic of every column of
+        two 2-D arrays at once. Both arrays are stacked and sorted column wise
+        in one call, and the empirical CDFs are evaluated with cumulative
+        counts at the last occurrence of every distinct value, which is what
+        `searchsorted(..., side="right")` returns in scipy's ks_2samp. NaNs
+        sort last and are not counted, so they are dropped per column.
+    ====================================================================================
+    PARAMETERS:
+        base_arr: 2-D float array of the base dataset, one column per feature
+        current_arr: 2-D float array of the current dataset with the same columns
+    ====================================================================================
+    RETURN:
+        Tuple of arrays: KS statistics, non-NaN counts of base and of current columns
+    """
+    try:
+        n_base_rows = base_arr.shape[0]
+        combined = np.concatenate([base_arr, current_arr], axis=0)
+        order = np.argsort(combined, axis=0, kind="stable")
+        values = np.take_along_axis(combined, order, axis=0)
+        valid = ~np.isnan(values)
+        is_base = order < n_base_rows
+
+        count_base = np.cumsum(is_base & valid, axis=0)
+        count_current = np.cumsum(~is_base & valid, axis=0)
+        n_base, n_current = count_base[-1], count_current[-1]
+
+        #The CDFs are only compared at the last position of every run of equal values
+        is_last = np.ones_like(valid)
+        is_last[:-1] = values[1:] != values[:-1]
+        is_last &= valid
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cddiffs = count_base / n_base - count_current / n_current
+        max_diff = np.where(is_last, cddiffs, -np.inf).max(axis=0)
+        min_diff = np.clip(-np.where(is_last, cddiffs, np.inf).min(axis=0), 0, 1)
+        statistics = np.maximum(min_diff, max_diff)
+        statistics[(n_base == 0) | (n_current == 0)] = np.nan
+        return statistics, n_base, n_current
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def ks_2samp_columns(base_arr: np.ndarray, current_arr: np.ndarray, block_size: int = 32):
+    """
+    DESCRIPTION:
+        This function runs the two-sided two-sample KS test on every column of
+        two 2-D arrays and matches scipy's `ks_2samp` on the non-NaN values of
+        each column. Statistics are computed in blocks of `block_size` columns
+        to bound memory. The asymptotic p-values are computed in one vectorized
+        call; columns small enough for scipy's exact mode fall back to `ks_2samp`.
+    ====================================================================================
+    PARAMETERS:
+        base_arr: 2-D float array of the base dataset, one column per feature
+        current_arr: 2-D float array of the current dataset with the same columns
+        block_size: number of columns sorted together
+    ====================================================================================
+    RETURN:
+        Tuple of arrays: KS statistics and p-values, one per column, NaN for a
+        column without values in either array, i.e. insufficient data
+    """
+    try:
+        base_arr = np.asarray(base_arr, dtype=np.float64)
+        current_arr = np.asarray(current_arr, dtype=np.float64)
+        n_columns = base_arr.shape[1]
+        statistics = np.empty(n_columns)
+        n_base = np.empty(n_columns, dtype=np.int64)
+        n_current = np.empty(n_columns, dtype=np.int64)
+        for start in range(0, n_columns, block_size):
+            stop = min(start + block_size, n_columns)
+            statistics[start:stop], n_base[start:stop], n_current[start:stop] = ks_statistic_columns(
+                base_arr[:, start:stop], current_arr[:, start:stop])
+
+        m = np.maximum(n_base, n_current).astype(np.float64)
+        n = np.minimum(n_base, n_current).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            en = m * n / (m + n)
+        pvalues = np.clip(kstwo.sf(statistics, np.round(en)), 0, 1)
+
+        for column in np.flatnonzero((m <= KS_EXACT_MAX_N) & (n > 0)):
+            base_data = base_arr[:, column]
+            current_data = current_arr[:, column]
+            result = ks_2samp(base_data[~np.isnan(base_data)], current_data[~np.isnan(current_data)])
+            statistics[column], pvalues[column] = result.statistic, result.pvalue
+        return statistics, pvalues
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def psi_columns(base_arr: np.ndarray, current_arr: np.ndarray, n_bins: int = PSI_N_BINS) -> np.ndarray:
+    """
+    DESCRIPTION:
+        This function computes the population stability index of every column.
+        The bins are the quantiles of the base column, and bin shares are floored
+        at PSI_EPSILON so empty bins do not make the index infinite. NaNs are
+        dropped per column.
+    ====================================================================================
+    PARAMETERS:
+        base_arr: 2-D float array of the base dataset, one column per feature
+        current_arr: 2-D float array of the current dataset with the same columns
+        n_bins: number of quantile bins
+    ====================================================================================
+    RETURN:
+        Array of PSI values, one per column
+    """
+    try:
+        psi = np.full(base_arr.shape[1], np.nan)
+        for column in range(base_arr.shape[1]):
+            base_data = base_arr[:, column][~np.isnan(base_arr[:, column])]
+            current_data = current_arr[:, column][~np.isnan(current_arr[:, column])]
+            if len(base_data) == 0 or len(current_data) == 0:
+                continue
+            edges = np.unique(np.quantile(base_data, np.linspace(0, 1, n_bins + 1)[1:-1]))
+            base_share = np.bincount(np.searchsorted(edges, base_data, side="right"),
+                                     minlength=len(edges) + 1) / len(base_data)
+            current_share = np.bincount(np.searchsorted(edges, current_data, side="right"),
+                                        minlength=len(edges) + 1) / len(current_data)
+            base_share = np.clip(base_share, PSI_EPSILON, None)
+            current_share = np.clip(current_share, PSI_EPSILON, None)
+            psi[column] = np.sum((current_share - base_share) * np.log(current_share / base_share))
+        return psi
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def wasserstein_columns(base_arr: np.ndarray, current_arr: np.ndarray) -> np.ndarray:
+    """
+    DESCRIPTION:
+        This function computes the first Wasserstein distance between the base
+        and the current values of every column. NaNs are dropped per column.
+    ====================================================================================
+    PARAMETERS:
+        base_arr: 2-D float array of the base dataset, one column per feature
+        current_arr: 2-D float array of the current dataset with the same columns
+    ====================================================================================
+    RETURN:
+        Array of Wasserstein distances, one per column
+    """
+    try:
+        distances = np.full(base_arr.shape[1], np.nan)
+        for column in range(base_arr.shape[1]):
+            base_data = base_arr[:, column][~np.isnan(base_arr[:, column])]
+            current_data = current_arr[:, column][~np.isnan(current_arr[:, column])]
+            if len(base_data) > 0 and len(current_data) > 0:
+                distances[column] = wasserstein_distance(base_data, current_data)
+        return distances
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def compute_drift(base_arr: np.ndarray, current_arr: np.ndarray, metrics) -> dict:
+    """
+    DESCRIPTION:
+        This function computes the selected drift metrics of every column:
+        "ks" gives the KS p-value, "psi" the population stability index and
+        "wasserstein" the Wasserstein distance.
+    ====================================================================================
+    PARAMETERS:
+        base_arr: 2-D float array of the base dataset, one column per feature
+        current_arr: 2-D float array of the current dataset with the same columns
+        metrics: names of the metrics to be computed
+    ====================================================================================
+    RETURN:
+        Dictionary of metric name to array of values, one per column
+    """
+    try:
+        results = dict()
+        for metric in metrics:
+            if metric == "ks":
+                _, results[metric] = ks_2samp_columns(base_arr, current_arr)
+            elif metric == "psi":
+                results[metric] = psi_columns(base_arr, current_arr)
+            elif metric == "wasserstein":
+                results[metric] = wasserstein_columns(base_arr, current_arr)
+            else:
+                raise Exception(f"Unknown drift metric: {metric}, expected one of {DRIFT_METRICS}")
+        return results
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def compute_drift_block(base_shm_name: str, current_shm_name: str, base_shape: tuple, current_shape: tuple,
+                        start: int, stop: int, metrics) -> dict:
+    """
+    DESCRIPTION:
+        This function runs in a worker process. It attaches to the shared
+        memory holding the base and current arrays and computes the drift
+        metrics of the columns `start` to `stop` without copying the data.
+    ====================================================================================
+    RETURN:
+        Dictionary of metric name to array of values, one per column of the block
+    """
+    base_shm = SharedMemory(name=base_shm_name)
+    current_shm = SharedMemory(name=current_shm_name)
+    try:
+        base_arr = np.ndarray(base_shape, dtype=np.float64, buffer=base_shm.buf, order="F")[:, start:stop]
+        current_arr = np.ndarray(current_shape, dtype=np.float64, buffer=current_shm.buf, order="F")[:, start:stop]
+        return compute_drift(base_arr, current_arr, metrics)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+    finally:
+        #The views into the shared memory must be released before it is closed
+        base_arr = current_arr = None
+        base_shm.close()
+        current_shm.close()
+
+
+def drift_columns(base_arr: np.ndarray, current_arr: np.ndarray, metrics = ("ks",), n_workers: int = 1,
+                  block_size: int = 32) -> dict:
+    """
+    DESCRIPTION:
+        This function computes the selected drift metrics of every column. With
+        more than one worker, the arrays are copied once into shared memory in
+        column-major order and blocks of `block_size` columns are fanned out
+        to a process pool, so workers read their columns without pickling them.
+    ====================================================================================
+    PARAMETERS:
+        base_arr: 2-D float array of the base dataset, one column per feature
+        current_arr: 2-D float array of the current dataset with the same columns
+        metrics: names of the metrics to be computed, see DRIFT_METRICS
+        n_workers: number of worker processes
+        block_size: number of columns per task
+    ====================================================================================
+    RETURN:
+        Dictionary of metric name to array of values, one per column
+    """
+    try:
+        base_arr = np.asarray(base_arr, dtype=np.float64)
+        current_arr = np.asarray(current_arr, dtype=np.float64)
+        if n_workers <= 1:
+            return compute_drift(base_arr, current_arr, metrics)
+
+        n_columns = base_arr.shape[1]
+        blocks = [(start, min(start + block_size, n_columns)) for start in range(0, n_columns, block_size)]
+        logging.info(f"Computing drift metrics {list(metrics)} of {n_columns} columns with {n_workers} workers.")
+        base_shm = SharedMemory(create=True, size=max(base_arr.nbytes, 1))
+        current_shm = SharedMemory(create=True, size=max(current_arr.nbytes, 1))
+        try:
+            np.ndarray(base_arr.shape, dtype=np.float64, buffer=base_shm.buf, order="F")[:] = base_arr
+            np.ndarray(current_arr.shape, dtype=np.float64, buffer=current_shm.buf, order="F")[:] = current_arr
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(compute_drift_block, base_shm.name, current_shm.name,
+                                           base_arr.shape, current_arr.shape, start, stop, tuple(metrics))
+                           for start, stop in blocks]
+                results = [future.result() for future in futures]
+        finally:
+            base_shm.close()
+            base_shm.unlink()
+            current_shm.close()
+            current_shm.unlink()
+
+        return {metric: np.concatenate([result[metric] for result in results]) for metric in metrics}
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
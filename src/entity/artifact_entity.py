@@ -1,11 +1,15 @@
 #Importing dependencies
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DataIngestionArtifact:
     feature_store_file_path: str
-    train_file_path: str
-    test_file_path: str
+    split_file_path: str
+    #Digest of the feature store computed while it was written, so later components do not hash it again
+    feature_store_hash: Optional[str] = None
+    #Ingestion mode of the run, "incremental" meaning a persistent feature store only growing by new partitions
+    ingestion_mode: Optional[str] = None
 
 @dataclass
 class DataValidationArtifact:
@@ -16,18 +20,44 @@ class DataTransformationArtifact:
     transform_object_path:str
     transformed_train_path:str
     transformed_test_path:str
+    transformed_train_target_path:str
+    transformed_test_target_path:str
     target_encoder_path:str
+    rebalancing_strategy:str
+    #Number of cores of the neighbour searches of the resampling, as configured for the transformation
+    rebalancing_n_jobs:Optional[int] = None
+    #Train dataset before resampling, the same files as the train dataset if the strategy does not resample
+    transformed_train_unbalanced_path:Optional[str] = None
+    transformed_train_unbalanced_target_path:Optional[str] = None
+    #Resampling left to the model trainer, which only resamples the train dataset when it trains from scratch
+    resampling_deferred:bool = False
 
 @dataclass
 class ModelTrainerArtifact:
     model_path: str
+    fused_transformer_path: str
     acc_train_score: float
     f1_train_score: float
     acc_test_score: float
     f1_test_score: float
+    cost_train_score: Optional[float] = None
+    cost_test_score: Optional[float] = None
+    decision_threshold: Optional[float] = None
+    #Decision threshold and number of trained feature store rows, saved next to the model
+    training_state_path: Optional[str] = None
+    best_params: Optional[dict] = None
+    search_trace: Optional[list] = None
+    cv_scores: Optional[list] = None
 
 
 @dataclass
 class ModelEvaluationArtifact:
     is_model_accepted: bool
     improved_accuracy: float
+    registry_scores: Optional[list] = None
+
+
+@dataclass
+class ModelPusherArtifact:
+    saved_model_dir: str
+    saved_version_dir: str
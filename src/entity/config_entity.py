@@ -1,6 +1,7 @@
 #Importing libraries and dependencies
 import os, sys
 from datetime import datetime
+from typing import Optional
 #=============================================================
 from src.exception import APSException
 from src.logger import logging
@@ -10,15 +11,66 @@ from src.logger import logging
 FILE_NAME = "sensor.csv"
 TRAIN_FILE_NAME = "train.csv"
 TEST_FILE_NAME = "test.csv"
+SPLIT_FILE_NAME = "test_mask.npy"
 TEST_SIZE = 0.2
 RANDOM_STATE = 42
+STRATIFY = True
 MISSING_THRESHOLD = 0.2
+DRIFT_METRICS = ["ks"]
+DRIFT_N_WORKERS = 1
+PSI_THRESHOLD = 0.2
+VALIDATION_MODE = "in_memory"
+VALIDATION_BATCH_SIZE = 100000
+VALIDATION_SKETCH_SIZE = 2048
 TRANSFORMER_OBJECT_FILE_NAME = "transformer.pkl"
 TARGET_ENCODER_OBJECT_FILE_NAME = "target_encoder.pkl"
 MODEL_FILE_NAME = "model.pkl"
+FUSED_TRANSFORMER_FILE_NAME = "fused_transformer.pkl"
+TRAINING_STATE_FILE_NAME = "training_state.yaml"
+BASE_PROFILE_FILE_NAME = "base_profile.npz"
 OVERFITTING_THRESHOLD = 0.1
 EXPECTED_SCORE = 0.7
 CHANGE_THRESHOLD = 0.1
+INGESTION_MODE = "stream"
+INGESTION_BATCH_SIZE = 10000
+INGESTION_N_WORKERS = 4
+FEATURE_STORE_DIR_NAME = "feature_store"
+WATERMARK_FILE_NAME = "watermark.yaml"
+ARTIFACT_FORMAT = "parquet"
+ARTIFACT_STORE_DIR_NAME = "artifact_store"
+DEDUPLICATE_ARTIFACTS = True
+TRANSFORMER_CACHE_DIR_NAME = "transformer_cache"
+TRANSFORMER_CACHE_SIZE = 4
+TRANSFORMATION_MODE = "in_memory"
+TRANSFORMATION_BATCH_SIZE = 100000
+TRANSFORMATION_SKETCH_SIZE = 2048
+TARGET_DTYPE = "int8"
+REBALANCING_STRATEGY = "smotetomek"
+REBALANCING_N_JOBS = -1
+MMAP_MODE = "r"
+MODEL_SEARCH = False
+SEARCH_N_CANDIDATES = 27
+SEARCH_N_WORKERS = 4
+SEARCH_MIN_ROUNDS = 50
+SEARCH_MAX_ROUNDS = 1000
+SEARCH_HALVING_FACTOR = 3
+SEARCH_EARLY_STOPPING_ROUNDS = 20
+SEARCH_VALIDATION_SIZE = 0.2
+SEARCH_TIME_BUDGET = 3600
+EXTERNAL_MEMORY = False
+EXTERNAL_MEMORY_BATCH_SIZE = 100000
+MAX_BIN = 256
+INCREMENTAL_TRAINING = False
+INCREMENTAL_ROUNDS = 50
+INCREMENTAL_TRANSFORMER_RTOL = 0.05
+CROSS_VALIDATION = False
+CV_N_FOLDS = 5
+CV_N_WORKERS = None
+CHECKPOINT_INTERVAL = 50
+EVALUATION_N_VERSIONS = 1
+EVALUATION_CACHE_DIR_NAME = "evaluation_cache"
+EVALUATION_CACHE_SIZE = 8
+EVALUATION_SCORES_FILE_NAME = "evaluation_scores.yaml"
 
 
 class TrainingPipelineConfig:
@@ -28,14 +80,17 @@ class TrainingPipelineConfig:
     that includes the current working directory, a folder named "artifact",
     and a timestamp formatted as year-month-day and hour-minute-second.
 
+    Passing the artifact_dir of an earlier run reuses it instead, e.g. to
+    resume the model training of that run from its checkpoints.
+
     Return:
     It will create a new directory for storing artifacts corresponding to the
     components of the pipeline, with the directory name indicating when the 
     artifacts were generated.
     """
-    def __init__(self):
+    def __init__(self, artifact_dir: Optional[str] = None):
         try:
-            self.artifact_dir = os.path.join(os.getcwd(), "artifact", f"{datetime.now().strftime('%Y%m%d__||__%H%M%S')}")
+            self.artifact_dir = artifact_dir or os.path.join(os.getcwd(), "artifact", f"{datetime.now().strftime('%Y%m%d__||__%H%M%S')}")
         except Exception as e:
             logging.error(APSException(e,sys))
             raise APSException(e,sys)
@@ -49,21 +104,40 @@ class DataIngestionConfig:
         try:
             self.database_name="aps"
             self.collection_name="sensor"
+
+            #Ingestion mode: "full" loads the collection in one go, "stream" reads it in batches of {batch_size} documents,
+            #"incremental" only reads the documents added since the last run into the persistent feature store,
+            #"parallel" reads {n_workers} _id ranges of the collection concurrently
+            self.ingestion_mode = INGESTION_MODE
+            self.batch_size = INGESTION_BATCH_SIZE
+            self.n_workers = INGESTION_N_WORKERS
+
+            #Persistent feature store shared across runs: feature_store/part-*.parquet || feature_store/watermark.yaml
+            self.persistent_feature_store_dir = os.path.join(os.getcwd(), FEATURE_STORE_DIR_NAME)
+            self.watermark_file_path = os.path.join(self.persistent_feature_store_dir, WATERMARK_FILE_NAME)
+
+            #Train/test split of the persistent feature store, only new rows are split so a row never changes side: feature_store/test_mask.npy
+            self.persistent_split_file_path = os.path.join(self.persistent_feature_store_dir, SPLIT_FILE_NAME)
             
             #Using the TrainingPipelineConfig creating directory:  artifact/__timestamp__/data_ingestion
             self.data_ingestion_dir = os.path.join(training_pipeline_config.artifact_dir , "data_ingestion")
+
+            #File format of the datasets written by data ingestion: "parquet" or "csv"
+            self.artifact_format = ARTIFACT_FORMAT
             
-            #Creating directory {feature_store} containing {sensor.csv}
-            self.feature_store_file_path = os.path.join(self.data_ingestion_dir,"feature_store",FILE_NAME)
+            #Creating directory {feature_store} containing {sensor.parquet}
+            self.feature_store_file_path = os.path.join(self.data_ingestion_dir,"feature_store",FILE_NAME.replace("csv",self.artifact_format))
             
-            #Creating directory {dataset} containig {train.csv} || {test.csv}
-            self.train_file_path = os.path.join(self.data_ingestion_dir,"dataset",TRAIN_FILE_NAME)
-            self.test_file_path = os.path.join(self.data_ingestion_dir,"dataset",TEST_FILE_NAME)
+            #Creating directory {dataset} containig {test_mask.npy}: boolean mask over the feature store rows, True for test rows
+            self.split_file_path = os.path.join(self.data_ingestion_dir,"dataset",SPLIT_FILE_NAME)
             
             #Population count of test dataset
             self.test_size = TEST_SIZE
             self.random_state = RANDOM_STATE
 
+            #Stratifying the split on the target column
+            self.stratify = STRATIFY
+
         except Exception  as e:
             raise APSException(e,sys)     
         
@@ -82,9 +156,25 @@ class DataValidationConfig:
         #Threshold limit for data validation stage
         self.missing_threshold:float = MISSING_THRESHOLD
 
+        #Drift metrics computed per column: any of "ks", "psi", "wasserstein", and number of worker processes computing them
+        self.drift_metrics:list = DRIFT_METRICS
+        self.drift_n_workers:int = DRIFT_N_WORKERS
+
+        #Columns with a PSI above this threshold are reported as drifted
+        self.psi_threshold:float = PSI_THRESHOLD
+
+        #Validation mode: "in_memory" loads train and test datasets, "stream" reads them in chunks of {batch_size} rows
+        #into per-column quantile sketches of {sketch_size} items per level, keeping memory bounded
+        self.validation_mode:str = VALIDATION_MODE
+        self.batch_size:int = VALIDATION_BATCH_SIZE
+        self.sketch_size:int = VALIDATION_SKETCH_SIZE
+
         #Stored file for validation in .csv format
         self.base_file_path = self.base_file_path = os.path.join("aps_failure_training_set1.csv")
 
+        #Persisted profile of the base dataset, rebuilt only when the hash of the base file changes
+        self.base_profile_file_path = os.path.join(BASE_PROFILE_FILE_NAME)
+
 
 class DataTransformationConfig:
 
@@ -102,9 +192,39 @@ class DataTransformationConfig:
         #In data transformation directiory a folder is created transformed, inside that test dataset is stored in .npz format  after transformation.
         self.transformed_test_path =os.path.join(self.data_transformation_dir,"transformed",TEST_FILE_NAME.replace("csv","npz"))
 
+        #The encoded target column is stored apart from the input features, in {target_dtype}: train_target.npz || test_target.npz
+        #Input features keep the dtype declared by the sensor schema, see src.config.SensorSchema.feature_dtype
+        self.transformed_train_target_path = os.path.join(self.data_transformation_dir,"transformed",TRAIN_FILE_NAME.replace(".csv","_target.npz"))
+        self.transformed_test_target_path = os.path.join(self.data_transformation_dir,"transformed",TEST_FILE_NAME.replace(".csv","_target.npz"))
+        self.target_dtype:str = TARGET_DTYPE
+
+        #With a resampling strategy, the train dataset is also stored before resampling, so validation folds carved out of it
+        #only hold real rows: train_unbalanced.npz || train_unbalanced_target.npz
+        self.transformed_train_unbalanced_path = os.path.join(self.data_transformation_dir,"transformed",TRAIN_FILE_NAME.replace(".csv","_unbalanced.npz"))
+        self.transformed_train_unbalanced_target_path = os.path.join(self.data_transformation_dir,"transformed",TRAIN_FILE_NAME.replace(".csv","_unbalanced_target.npz"))
+
+        #Rebalancing strategy of the train dataset: "smotetomek", "smotetomek_approx" (neighbours searched in a projection),
+        #"class_weight" (no resampling, the positive class is weighted by the model) or "none", see src.rebalancing.
+        #The neighbour searches run on {rebalancing_n_jobs} cores, -1 for all cores. In "incremental" ingestion mode the
+        #resampling is left to the model trainer, which only needs it to train from scratch
+        self.rebalancing_strategy:str = REBALANCING_STRATEGY
+        self.rebalancing_n_jobs:int = REBALANCING_N_JOBS
+
         #In data transformation directiory a folder is created target_encoder, inside that target_encoder is stored in .pkl format  after transformation.
         self.target_encoder_path = os.path.join(self.data_transformation_dir,"target_encoder",TARGET_ENCODER_OBJECT_FILE_NAME)
 
+        #Transformation mode: "in_memory" fits the transformer on the whole train dataset, "chunked" reads the datasets
+        #in chunks of {batch_size} rows, fits the robust scaler from quantile sketches of {sketch_size} items per level
+        #and writes the transformed chunks straight to the transformed arrays
+        self.transformation_mode:str = TRANSFORMATION_MODE
+        self.batch_size:int = TRANSFORMATION_BATCH_SIZE
+        self.sketch_size:int = TRANSFORMATION_SKETCH_SIZE
+
+        #Cache of fitted transformers and transformed arrays shared across runs, keyed by the hash of the training input.
+        #Holds at most {transformer_cache_size} entries, 0 disables the cache.
+        self.transformer_cache_dir = os.path.join(os.getcwd(), TRANSFORMER_CACHE_DIR_NAME)
+        self.transformer_cache_size = TRANSFORMER_CACHE_SIZE
+
 
 class ModelTrainerConfig:
 
@@ -116,14 +236,97 @@ class ModelTrainerConfig:
         #Inside the above directory a folder is created "model" that will contain the trained model by name model.pkl
         self.model_path = os.path.join(self.model_trainer_dir, "model", MODEL_FILE_NAME)
 
+        #Next to the model, the fitted transformer compiled into a fused inference transform: fused_transformer.pkl
+        self.fused_transformer_path = os.path.join(self.model_trainer_dir, "model", FUSED_TRANSFORMER_FILE_NAME)
+
+        #Next to the model, its decision threshold and the number of feature store rows it was trained on: training_state.yaml
+        self.training_state_path = os.path.join(self.model_trainer_dir, "model", TRAINING_STATE_FILE_NAME)
+
+        #Train dataset resampled by the model trainer when the data transformation deferred it, see DataTransformation:
+        #resampled/train.npz || resampled/train_target.npz
+        self.resampled_train_path = os.path.join(self.model_trainer_dir, "resampled", TRAIN_FILE_NAME.replace("csv","npz"))
+        self.resampled_train_target_path = os.path.join(self.model_trainer_dir, "resampled", TRAIN_FILE_NAME.replace(".csv","_target.npz"))
+
         #Threshold value to check for overfitting and underfitting of the model
         self.overiftting_threshold = OVERFITTING_THRESHOLD
         self.expected_score = EXPECTED_SCORE
 
+        #Transformed datasets are memory-mapped in {mmap_mode} mode, "r" or "c", None reads them into memory.
+        #Writable modes are rejected, they would write through to the content shared in the artifact store.
+        self.mmap_mode = MMAP_MODE
+
+        #Hyperparameter search by successive halving, see src.model_search: {search_n_candidates} candidates fitted by
+        #{search_n_workers} processes from {search_min_rounds} up to {search_max_rounds} rounds, keeping 1/{search_halving_factor}
+        #of them per rung, with early stopping on a validation fold. No rung is started after {search_time_budget} seconds.
+        self.model_search:bool = MODEL_SEARCH
+        self.search_n_candidates:int = SEARCH_N_CANDIDATES
+        self.search_n_workers:int = SEARCH_N_WORKERS
+        self.search_min_rounds:int = SEARCH_MIN_ROUNDS
+        self.search_max_rounds:int = SEARCH_MAX_ROUNDS
+        self.search_halving_factor:int = SEARCH_HALVING_FACTOR
+        self.search_early_stopping_rounds:int = SEARCH_EARLY_STOPPING_ROUNDS
+        self.search_validation_size:float = SEARCH_VALIDATION_SIZE
+        self.search_time_budget = SEARCH_TIME_BUDGET
+        #The fit fold, resampled once, and the validation fold of the search are written to search, where the workers memory-map them
+        self.search_dir = os.path.join(self.model_trainer_dir, "search")
+
+        #The transformed datasets are quantized once into XGBoost matrices of {max_bin} bins per feature, reused for training
+        #and prediction. With {external_memory} they are read in chunks of {external_memory_batch_size} rows and paged to dmatrix_cache.
+        self.max_bin:int = MAX_BIN
+        self.external_memory:bool = EXTERNAL_MEMORY
+        self.external_memory_batch_size:int = EXTERNAL_MEMORY_BATCH_SIZE
+        self.external_memory_cache_dir = os.path.join(self.model_trainer_dir, "dmatrix_cache")
+
+        #Incremental training: the latest model of the registry keeps boosting for {incremental_rounds} rounds on the
+        #feature store rows ingested since it was trained, transformed by its own transformer and rebalanced, as long as
+        #its transformer matches the current one within a relative tolerance of {incremental_transformer_rtol}, the
+        #centers being compared in units of the scale. Only the "incremental" ingestion mode tells the new rows apart,
+        #in any other mode or if the transformers differ, the model is trained from scratch.
+        self.incremental_training:bool = INCREMENTAL_TRAINING
+        self.incremental_rounds:int = INCREMENTAL_ROUNDS
+        self.incremental_transformer_rtol:float = INCREMENTAL_TRANSFORMER_RTOL
+
+        #Stratified k-fold cross-validation of the model on {cv_n_folds} folds fitted concurrently by {cv_n_workers}
+        #processes, one per fold up to the number of cores if None. The cores are shared between the folds.
+        self.cross_validation:bool = CROSS_VALIDATION
+        self.cv_n_folds:int = CV_N_FOLDS
+        self.cv_n_workers = CV_N_WORKERS
+
+        #The booster is saved every {checkpoint_interval} rounds in checkpoints, 0 disables the checkpoints.
+        #A rerun of the same run, see TrainingPipelineConfig, resumes from the last checkpoint.
+        self.checkpoint_dir = os.path.join(self.model_trainer_dir, "checkpoints")
+        self.checkpoint_interval:int = CHECKPOINT_INTERVAL
+
 
 class ModelEvaluationConfig:
 
     def __init__(self, 
                  training_pipeline_config: TrainingPipelineConfig,):
+        #Using the TrainingPipelineConfig creating directory:  artifact/__timestamp__/model_evaluation
+        self.model_evaluation_dir = os.path.join(training_pipeline_config.artifact_dir, "model_evaluation")
+
         #Setting up threshold value for model evaluation
         self.change_threshold = CHANGE_THRESHOLD
+
+        #The current model is scored against the last {n_versions} versions of the model registry, the latest one being the champion
+        self.n_versions:int = EVALUATION_N_VERSIONS
+
+        #In model evaluation directory a folder is created transformed, inside that the test dataset transformed by every
+        #distinct transformer is stored in .npy format, together with the target encoded by every distinct target encoder
+        self.transformed_test_dir = os.path.join(self.model_evaluation_dir, "transformed")
+
+        #Cache of transformed test datasets shared across runs, keyed by the hash of the test dataset and of the transformer.
+        #Holds at most {evaluation_cache_size} entries, 0 disables the cache.
+        self.evaluation_cache_dir = os.path.join(os.getcwd(), EVALUATION_CACHE_DIR_NAME)
+        self.evaluation_cache_size:int = EVALUATION_CACHE_SIZE
+
+
+class ModelPusherConfig:
+
+    def __init__(self,
+                 training_pipeline_config: TrainingPipelineConfig,):
+        #Using the TrainingPipelineConfig creating directory:  artifact/__timestamp__/model_pusher
+        self.model_pusher_dir = os.path.join(training_pipeline_config.artifact_dir, "model_pusher")
+
+        #Model registry shared across runs: saved_models/__version__/model || transformer || target_encoder, see src.latest_path
+        self.saved_model_dir = os.path.join("saved_models")
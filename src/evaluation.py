@@ -0,0 +1,239 @@
+#Importing required dependencies
+import os, sys
+import time
+import numpy as np
+import xgboost as xgb
+from typing import Optional
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+from src import utils
+from src.metrics import classification_metrics
+from src.transformer_cache import TransformerCache
+from src.fused_transform import FusedTransformer
+from src.entity.config_entity import TARGET_DTYPE
+from src.config import TARGET_COLUMN, sensor_schema
+
+
+class EvaluationEngine:
+    """
+    DESCRIPTION:
+    Scores several models on the test dataset in one batched pass. The test
+    dataset is parsed at most once, with the columns of every transformer to
+    be applied, transformed once per distinct transformer through its fused
+    inference transform and its target encoded once per distinct target
+    encoder, fitted objects being told apart by the hash of their file. The transformed arrays are cached across runs
+    under the hash of the test dataset and of the fitted object, and the
+    models sharing a transformer are scored on the same XGBoost matrix.
+    The scores of a model are stored next to it under the hash of the test
+    dataset, so a registry model is scored once per test dataset.
+    """
+
+    def __init__(self, feature_store_file_path: str, split_file_path: str, transformed_test_dir: str,
+                 cache: Optional[TransformerCache] = None, feature_store_hash: Optional[str] = None):
+        try:
+            self.feature_store_file_path = feature_store_file_path
+            self.split_file_path = split_file_path
+            self.transformed_test_dir = transformed_test_dir
+            self.cache = cache
+            #The test dataset is fingerprinted by the feature store and the split, without being loaded;
+            #the digest of the feature store computed by the data ingestion is reused when given
+            if feature_store_hash is None:
+                feature_store_hash = utils.get_dataset_hash(file_path = feature_store_file_path)
+            self.test_set_hash = TransformerCache.get_key(feature_store_hash,
+                                                          utils.get_file_hash(file_path = split_file_path),
+                                                          TARGET_COLUMN,
+                                                          sensor_schema)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_cache_key(self, kind: str, object_hash: str) -> str:
+        return TransformerCache.get_key(self.test_set_hash, kind, object_hash)
+
+
+    def load_stored_scores(self, scores_path: Optional[str]) -> Optional[dict]:
+        """
+        DESCRIPTION:
+        Return the scores stored at `scores_path` for the current test
+        dataset, if any.
+        ================================================================
+        RETURN: dictionary of scores or None
+        """
+        try:
+            if scores_path is None or not os.path.exists(scores_path):
+                return None
+            return (utils.read_yaml_file(file_path = scores_path) or dict()).get(self.test_set_hash)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def store_scores(self, scores_path: str, scores: dict) -> None:
+        """
+        DESCRIPTION:
+        Add the scores of the current test dataset to the scores stored at
+        `scores_path`, keeping the scores of the other test datasets.
+        ================================================================
+        RETURN: None
+        """
+        try:
+            stored_scores = dict()
+            if os.path.exists(scores_path):
+                stored_scores = utils.read_yaml_file(file_path = scores_path) or dict()
+            stored_scores[self.test_set_hash] = scores
+            utils.write_yaml_file(file_path = scores_path, data = stored_scores)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_decision_threshold(self, candidate: dict) -> float:
+        """
+        DESCRIPTION:
+        Return the decision threshold of a candidate model: the one given
+        with it, else the one of its training state, else the default
+        threshold of 0.5 of XGBoost for models saved without one.
+        ================================================================
+        RETURN: predict positive if probability >= decision threshold
+        """
+        try:
+            if candidate.get("decision_threshold") is not None:
+                return float(candidate["decision_threshold"])
+            training_state_path = candidate.get("training_state_path")
+            if training_state_path is not None and os.path.exists(training_state_path):
+                decision_threshold = (utils.read_yaml_file(file_path = training_state_path) or dict()).get("decision_threshold")
+                if decision_threshold is not None:
+                    return float(decision_threshold)
+            return 0.5
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_test_arrays(self, transformer_paths: dict, target_encoder_paths: dict) -> tuple:
+        """
+        DESCRIPTION:
+        This function returns the test dataset transformed by every given
+        transformer and its target encoded by every given target encoder.
+        Arrays of the cache are linked and memory-mapped; the others are
+        computed from a single parse of the test dataset, reading only the
+        columns of the transformers that missed the cache, then cached.
+        ================================================================
+        PARAMETERS:
+        transformer_paths: hash of every distinct transformer mapped to its path
+        target_encoder_paths: hash of every distinct target encoder mapped to its path
+        ================================================================
+        RETURN:
+        Tuple: input features and encoded target, each a dictionary mapping
+        the hash of the fitted object to the array
+        """
+        try:
+            arrays = {"features": dict(), "target": dict()}
+            misses = {"features": dict(), "target": dict()}
+            for kind, object_paths in (("features", transformer_paths), ("target", target_encoder_paths)):
+                for object_hash, object_path in object_paths.items():
+                    file_path = os.path.join(self.transformed_test_dir, f"{kind}-{object_hash}.npy")
+                    if self.cache is not None and self.cache.load(key = self.get_cache_key(kind, object_hash),
+                                                                  file_paths = {"test.npy": file_path}):
+                        arrays[kind][object_hash] = utils.load_numpy_array_data(file_path = file_path, mmap_mode = "r")
+                    else:
+                        misses[kind][object_hash] = (utils.load_object(file_path = object_path), file_path)
+
+            if len(misses["features"]) + len(misses["target"]) == 0:
+                return arrays["features"], arrays["target"]
+
+            #The test dataset is parsed once, with the columns of every transformer to be applied
+            columns = [name for transformer, _ in misses["features"].values() for name in transformer.feature_names_in_]
+            logging.info(f"Loading test dataframe once for {len(misses['features'])} transformers "
+                         f"and {len(misses['target'])} target encoders.")
+            test_df = utils.load_split(feature_store_file_path = self.feature_store_file_path,
+                                       split_file_path = self.split_file_path,
+                                       subset = "test",
+                                       columns = list(dict.fromkeys([*columns, TARGET_COLUMN])),
+                                       schema = sensor_schema)
+
+            for kind, kind_misses in misses.items():
+                for object_hash, (fitted_object, file_path) in kind_misses.items():
+                    if kind == "features":
+                        #Inference goes through the fused transform of the pipeline, which matches it exactly;
+                        #the returned view of its buffer stays valid, as every transformer gets its own instance
+                        fused_transformer = FusedTransformer.from_pipeline(pipeline = fitted_object,
+                                                                           dtype = sensor_schema.feature_dtype)
+                        array = fused_transformer.transform(test_df)
+                    else:
+                        array = fitted_object.transform(test_df[TARGET_COLUMN]).astype(TARGET_DTYPE)
+                    utils.save_numpy_array_data(file_path = file_path, array = array)
+                    if self.cache is not None:
+                        self.cache.store(key = self.get_cache_key(kind, object_hash), file_paths = {"test.npy": file_path})
+                    arrays[kind][object_hash] = array
+            return arrays["features"], arrays["target"]
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def score_models(self, candidates: list) -> list:
+        """
+        DESCRIPTION:
+        This function scores every candidate model on the test dataset at
+        its decision threshold, see get_decision_threshold. Stored scores are reused;
+        the remaining models are grouped by transformer, and every group is
+        scored on one XGBoost matrix of the test dataset transformed once.
+        ================================================================
+        PARAMETERS:
+        candidates: list of dictionaries: name, model_path, transformer_path,
+        target_encoder_path and optionally scores_path, where the scores are
+        stored under the hash of the test dataset, and decision_threshold or
+        training_state_path
+        ================================================================
+        RETURN:
+        List of dictionaries, in the order of the candidates: name and the
+        scores of classification_metrics
+        """
+        try:
+            start_time = time.perf_counter()
+            scores = [self.load_stored_scores(scores_path = candidate.get("scores_path")) for candidate in candidates]
+            pending = [index for index, candidate_scores in enumerate(scores) if candidate_scores is None]
+            for index in set(range(len(candidates))) - set(pending):
+                logging.info(f"Reusing stored scores of {candidates[index]['name']} on test dataset: {self.test_set_hash}")
+
+            if len(pending) > 0:
+                transformer_hashes = {index: utils.get_file_hash(file_path = candidates[index]["transformer_path"])
+                                      for index in pending}
+                target_encoder_hashes = {index: utils.get_file_hash(file_path = candidates[index]["target_encoder_path"])
+                                         for index in pending}
+                features, targets = self.get_test_arrays(
+                    transformer_paths = {transformer_hashes[index]: candidates[index]["transformer_path"] for index in pending},
+                    target_encoder_paths = {target_encoder_hashes[index]: candidates[index]["target_encoder_path"] for index in pending})
+
+                for transformer_hash, input_arr in features.items():
+                    dmatrix = xgb.DMatrix(np.asarray(input_arr))
+                    for index in pending:
+                        if transformer_hashes[index] != transformer_hash:
+                            continue
+                        model = utils.load_object(file_path = candidates[index]["model_path"])
+                        y_prob = model.get_booster().predict(dmatrix)
+                        decision_threshold = self.get_decision_threshold(candidate = candidates[index])
+                        scores[index] = classification_metrics(y_true = targets[target_encoder_hashes[index]],
+                                                               y_pred = y_prob >= decision_threshold)
+                        if candidates[index].get("scores_path") is not None:
+                            self.store_scores(scores_path = candidates[index]["scores_path"], scores = scores[index])
+
+            results = [dict(name = candidate["name"], **candidate_scores)
+                       for candidate, candidate_scores in zip(candidates, scores)]
+            for result in results:
+                logging.info(f"Scores on test dataset: {result}")
+            logging.info(f"Scoring {len(candidates)} models took {time.perf_counter() - start_time:.3f} seconds, "
+                         f"{len(pending)} of them scored in this run.")
+            return results
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
@@ -0,0 +1,84 @@
+#Importing required dependencies
+import sys
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+
+
+class FusedTransformer:
+    """
+    DESCRIPTION:
+    Minimal inference counterpart of the fitted transformation pipeline
+    (SimpleImputer with a constant, then RobustScaler). The whole pipeline
+    is `(nan_to_num(x, fill_value) - center) / scale`, computed in place on
+    a preallocated buffer, without sklearn's per-call validation. The same
+    operations as sklearn are applied in the same order and dtypes, so the
+    output matches the pipeline exactly. The buffer is reused across calls,
+    so an instance must not be shared between threads.
+    """
+
+    def __init__(self, feature_names_in: list, fill_value: float, center: np.ndarray, scale: np.ndarray,
+                 dtype: str = "float32"):
+        try:
+            self.feature_names_in_ = np.asarray(feature_names_in, dtype=object)
+            self.fill_value = fill_value
+            self.center = center
+            self.scale = scale
+            self.dtype = np.dtype(dtype)
+            self.buffer = np.empty((0, len(self.feature_names_in_)), dtype=self.dtype)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline, dtype: str = "float32") -> "FusedTransformer":
+        """
+        Compile a fitted pipeline of get_data_transformer_object. Steps the
+        robust scaler was told to skip become a no-op center of 0 or scale of 1.
+        """
+        try:
+            imputer = pipeline.named_steps["Imputer"]
+            robust_scaler = pipeline.named_steps["RobustScaler"]
+            if imputer.strategy != "constant":
+                raise Exception(f"Only constant imputation can be fused, got: {imputer.strategy}")
+            n_features = robust_scaler.n_features_in_
+            center = robust_scaler.center_ if robust_scaler.with_centering else np.zeros(n_features)
+            scale = robust_scaler.scale_ if robust_scaler.with_scaling else np.ones(n_features)
+            return cls(feature_names_in = list(pipeline.feature_names_in_),
+                       fill_value = imputer.fill_value,
+                       center = center,
+                       scale = scale,
+                       dtype = dtype)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Transform a DataFrame, whose feature columns are selected by name, or
+        a 2-D array whose columns are in the order of feature_names_in_. The
+        returned array is a view of the internal buffer, valid until the next
+        call.
+        """
+        try:
+            if isinstance(X, pd.DataFrame):
+                X = X[self.feature_names_in_]
+            n_rows = X.shape[0]
+            if self.buffer.shape[0] < n_rows:
+                self.buffer = np.empty((n_rows, len(self.feature_names_in_)), dtype=self.dtype)
+            out = self.buffer[:n_rows]
+            np.copyto(out, X, casting="unsafe")
+            #Only NaNs are imputed, infinite values are left as they are, like SimpleImputer does
+            np.nan_to_num(out, copy=False, nan=self.fill_value, posinf=np.inf, neginf=-np.inf)
+            np.subtract(out, self.center, out=out, casting="unsafe")
+            np.divide(out, self.scale, out=out, casting="unsafe")
+            return out
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
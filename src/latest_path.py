@@ -1,11 +1,11 @@
 #Importing required dependencies
 import os, sys
-from glob import glob
 from typing import Optional
 #=======================================================
 from src.logger import logging
 from src.exception import APSException
-from src.entity.config_entity import TRANSFORMER_OBJECT_FILE_NAME, MODEL_FILE_NAME, TARGET_ENCODER_OBJECT_FILE_NAME
+from src.entity.config_entity import TRANSFORMER_OBJECT_FILE_NAME, MODEL_FILE_NAME, TARGET_ENCODER_OBJECT_FILE_NAME, FUSED_TRANSFORMER_FILE_NAME, \
+                                     TRAINING_STATE_FILE_NAME, EVALUATION_SCORES_FILE_NAME
 
 class LatestPathFinder:
 
@@ -54,6 +54,47 @@ class LatestPathFinder:
             raise APSException(e, sys)
 
 
+    def get_latest_dir_paths(self, n_versions: int) -> list:
+        """
+        DESCRIPTION:
+        Return the paths of the last `n_versions` directories of the
+        model registry, the latest directory first.
+        ================================================================
+        RETURN: list of directory paths, empty if the registry is empty
+        """
+        try:
+            dir_names = sorted(map(int, os.listdir(self.model_registry)), reverse=True)
+            return [os.path.join(self.model_registry, f"{dir_name}") for dir_name in dir_names[:n_versions]]
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_version_paths(self, dir_path: str) -> dict:
+        """
+        DESCRIPTION:
+        Return the paths of the saved objects of one directory of the
+        model registry, and of the scores of its model stored by the
+        model evaluation, and of its training state, which holds its
+        decision threshold.
+        ================================================================
+        RETURN:
+        dict: transformer, model, target encoder, evaluation scores and
+        training state paths
+        """
+        try:
+            return {"transformer_path": os.path.join(dir_path, self.transformer_dir_name, TRANSFORMER_OBJECT_FILE_NAME),
+                    "model_path": os.path.join(dir_path, self.model_dir_name, MODEL_FILE_NAME),
+                    "target_encoder_path": os.path.join(dir_path, self.target_encoder_dir_name, TARGET_ENCODER_OBJECT_FILE_NAME),
+                    "scores_path": os.path.join(dir_path, self.model_dir_name, EVALUATION_SCORES_FILE_NAME),
+                    "training_state_path": os.path.join(dir_path, self.model_dir_name, TRAINING_STATE_FILE_NAME)}
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
     def get_latest_model_path(self):
         """
         DESCRIPTION:
@@ -65,7 +106,7 @@ class LatestPathFinder:
         directory of the model registry.
         """
         try:
-            latest_dir = self.get_latest_dir_path
+            latest_dir = self.get_latest_dir_path()
             if latest_dir is None:
                 raise Exception(f"Model is not available.")
             return os.path.join(latest_dir,
@@ -76,6 +117,53 @@ class LatestPathFinder:
             logging.error(APSException(e, sys))
             raise APSException(e, sys)
         
+    def get_latest_fused_transformer_path(self):
+        """
+        DESCRIPTION:
+        Return the path of the fused inference transform, saved
+        next to the model in the latest directory of the model 
+        registry.
+        =============================================================
+        RETURN:
+        str: The path of the fused transformer object file in the 
+        latest directory of the model registry.
+        """
+        try:
+            latest_dir = self.get_latest_dir_path()
+            if latest_dir is None:
+                raise Exception(f"Fused transformer is not available.")
+            return os.path.join(latest_dir,
+                                self.model_dir_name,
+                                FUSED_TRANSFORMER_FILE_NAME,)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+        
+    def get_latest_training_state_path(self):
+        """
+        DESCRIPTION:
+        Return the path of the training state, i.e. the decision
+        threshold of the model and the number of feature store rows
+        it was trained on, saved next to the model in the latest
+        directory of the model registry.
+        =============================================================
+        RETURN:
+        str: The path of the training state file in the latest 
+        directory of the model registry.
+        """
+        try:
+            latest_dir = self.get_latest_dir_path()
+            if latest_dir is None:
+                raise Exception(f"Training state is not available.")
+            return os.path.join(latest_dir,
+                                self.model_dir_name,
+                                TRAINING_STATE_FILE_NAME,)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+        
     def get_latest_transformer_path(self):
         """
         DESCRIPTION:
@@ -208,3 +296,39 @@ class LatestPathFinder:
             raise e
 
 
+    def get_latest_save_fused_transformer_path(self):
+        """
+        DESCRIPTION:
+        This function returns the path of the fused transformer 
+        object file, next to the model in the latest save directory.
+        ====================================================
+        RETURN:
+        str: The path of the fused transformer object file in 
+        the latest save directory.
+        """
+        try:
+            latest_dir = self.get_latest_save_dir_path()
+            return os.path.join(latest_dir, 
+                                self.model_dir_name, 
+                                FUSED_TRANSFORMER_FILE_NAME)
+        except Exception as e:
+            raise e
+
+
+    def get_latest_save_training_state_path(self):
+        """
+        DESCRIPTION:
+        This function returns the path of the training state 
+        file, next to the model in the latest save directory.
+        ====================================================
+        RETURN:
+        str: The path of the training state file in the 
+        latest save directory.
+        """
+        try:
+            latest_dir = self.get_latest_save_dir_path()
+            return os.path.join(latest_dir, 
+                                self.model_dir_name, 
+                                TRAINING_STATE_FILE_NAME)
+        except Exception as e:
+            raise e
@@ -0,0 +1,132 @@
+#Importing required dependencies
+import sys
+import numpy as np
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+
+
+#Cost of the APS failure prediction challenge: an unnecessary check of a truck (false positive) costs 10,
+#a missed faulty air pressure system (false negative) costs 500
+COST_FP = 10
+COST_FN = 500
+
+
+def safe_divide(numerator, denominator):
+    """
+    Element-wise division returning 0 where the denominator is 0, as sklearn
+    does for precision, recall and F1-score without any positive label.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator != 0)
+
+
+def get_scores(tn, fp, fn, tp) -> dict:
+    """
+    DESCRIPTION:
+        This function derives the scores of binary predictions from the counts
+        of their confusion matrix. The counts can be scalars or arrays, e.g.
+        one count per decision threshold.
+    ====================================================================================
+    RETURN:
+        Dictionary: accuracy, precision, recall, F1-score and APS cost
+    """
+    try:
+        precision = safe_divide(tp, tp + fp)
+        recall = safe_divide(tp, tp + fn)
+        return {"accuracy": safe_divide(tp + tn, tn + fp + fn + tp),
+                "precision": precision,
+                "recall": recall,
+                "f1_score": safe_divide(2 * tp, 2 * tp + fp + fn),
+                "cost": COST_FP * np.asarray(fp) + COST_FN * np.asarray(fn)}
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def classification_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    """
+    DESCRIPTION:
+        This function builds the confusion matrix of binary predictions once,
+        with a single bincount over 2 * y_true + y_pred, and derives every
+        score from it.
+    ====================================================================================
+    PARAMETERS:
+        y_true: array of encoded target, 0 or 1
+        y_pred: array of predicted classes, 0 or 1
+    ====================================================================================
+    RETURN:
+        Dictionary: counts of the confusion matrix, accuracy, precision, recall,
+        F1-score and APS cost
+    """
+    try:
+        codes = 2 * np.asarray(y_true, dtype=np.int64) + np.asarray(y_pred, dtype=np.int64)
+        tn, fp, fn, tp = (int(count) for count in np.bincount(codes, minlength=4))
+        scores = {name: float(score) for name, score in get_scores(tn, fp, fn, tp).items()}
+        return dict(tn=tn, fp=fp, fn=fn, tp=tp, **scores)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def threshold_sweep(y_true: np.ndarray, y_prob: np.ndarray) -> dict:
+    """
+    DESCRIPTION:
+        This function scores every decision threshold in one pass. The
+        probabilities are sorted once in decreasing order, and the cumulative
+        counts of positive and negative labels give the confusion matrix of
+        predicting positive at or above every distinct probability, plus the
+        threshold above all probabilities, where nothing is predicted positive.
+    ====================================================================================
+    PARAMETERS:
+        y_true: array of encoded target, 0 or 1
+        y_prob: array of predicted probabilities of the positive class
+    ====================================================================================
+    RETURN:
+        Dictionary of arrays, one value per threshold: thresholds, counts of the
+        confusion matrix and the scores of get_scores
+    """
+    try:
+        y_true = np.asarray(y_true, dtype=np.int64)
+        y_prob = np.asarray(y_prob, dtype=np.float64)
+        order = np.argsort(-y_prob, kind="stable")
+        y_prob, y_true = y_prob[order], y_true[order]
+
+        #Last position of every run of equal probabilities, so tied rows are always predicted together
+        is_last = np.r_[y_prob[1:] != y_prob[:-1], True]
+        tp = np.r_[0, np.cumsum(y_true)[is_last]]
+        fp = np.r_[0, np.cumsum(1 - y_true)[is_last]]
+        n_pos, n_neg = tp[-1], fp[-1]
+        fn, tn = n_pos - tp, n_neg - fp
+        thresholds = np.r_[np.inf, y_prob[is_last]]
+        return dict(thresholds=thresholds, tn=tn, fp=fp, fn=fn, tp=tp, **get_scores(tn, fp, fn, tp))
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_best_threshold(y_true: np.ndarray, y_prob: np.ndarray, metric: str = "cost") -> tuple:
+    """
+    DESCRIPTION:
+        This function chooses the decision threshold with the lowest APS cost,
+        or with the highest value of another score of get_scores, from a
+        single threshold sweep.
+    ====================================================================================
+    RETURN:
+        Tuple: threshold, i.e. predict positive if probability >= threshold, and
+        its scores
+    """
+    try:
+        sweep = threshold_sweep(y_true, y_prob)
+        best = int(np.argmin(sweep[metric])) if metric == "cost" else int(np.argmax(sweep[metric]))
+        return float(sweep["thresholds"][best]), {name: float(values[best]) for name, values in sweep.items()
+                                                   if name != "thresholds"}
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
@@ -0,0 +1,208 @@
+#Importing required dependencies
+import os, sys
+import time
+import itertools
+import numpy as np
+import xgboost as xgb
+from concurrent.futures import ProcessPoolExecutor
+from xgboost import XGBClassifier
+from sklearn.model_selection import train_test_split
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+from src import metrics, rebalancing, utils
+
+
+#Values sampled for every hyperparameter of the candidates
+SEARCH_SPACE = {
+    "max_depth": [3, 4, 6, 8, 10],
+    "learning_rate": [0.03, 0.05, 0.1, 0.2, 0.3],
+    "subsample": [0.6, 0.8, 1.0],
+    "colsample_bytree": [0.5, 0.7, 1.0],
+    "min_child_weight": [1, 3, 5],
+    "reg_lambda": [0.5, 1.0, 5.0],
+}
+
+
+def sample_candidates(n_candidates: int, random_state = None) -> list:
+    """
+    DESCRIPTION:
+        This function samples `n_candidates` distinct configurations of
+        SEARCH_SPACE, the default XGBoost configuration being the first.
+    ====================================================================================
+    RETURN:
+        List of dictionaries of hyperparameters
+    """
+    try:
+        random = np.random.RandomState(random_state)
+        candidates, seen = [dict()], {()}
+        n_configurations = int(np.prod([len(values) for values in SEARCH_SPACE.values()]))
+        while len(candidates) < min(n_candidates, n_configurations + 1):
+            params = {name: values[random.randint(len(values))] for name, values in SEARCH_SPACE.items()}
+            if tuple(params.items()) not in seen:
+                seen.add(tuple(params.items()))
+                candidates.append(params)
+        return candidates
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+class TimeBudget(xgb.callback.TrainingCallback):
+    """
+    DESCRIPTION:
+    Training callback stopping the boosting once the wall-clock time passes
+    `deadline`, a time.time() value shared by all the worker processes, so
+    a single long rung cannot overrun the time budget of the search.
+    """
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        super().__init__()
+
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        #True stops the training
+        return time.time() > self.deadline
+
+
+def fit_candidate(fit_path: str, fit_target_path: str, val_path: str, val_target_path: str,
+                  params: dict, base_params: dict, n_estimators: int, n_jobs: int, early_stopping_rounds: int,
+                  deadline = None, random_state = None) -> dict:
+    """
+    DESCRIPTION:
+        This function runs in a worker process. It memory-maps the fit and
+        the validation folds, so the data is never pickled nor copied, fits
+        one candidate for at most `n_estimators` rounds with early stopping
+        on the validation fold, or until `deadline`, and scores it on that
+        fold.
+    ====================================================================================
+    RETURN:
+        Dictionary: hyperparameters, rounds, best iteration, F1-score and fit time
+    """
+    try:
+        start_time = time.perf_counter()
+        booster_params = XGBClassifier(**base_params, **params, n_jobs = n_jobs, random_state = random_state).get_xgb_params()
+        dfit = xgb.QuantileDMatrix(np.load(fit_path, mmap_mode="r"),
+                                   label = np.load(fit_target_path, mmap_mode="r"),
+                                   max_bin = booster_params.get("max_bin") or 256)
+        y_val = np.load(val_target_path, mmap_mode="r")
+        dval = xgb.QuantileDMatrix(np.load(val_path, mmap_mode="r"), label = y_val, ref = dfit)
+        callbacks = [xgb.callback.EarlyStopping(rounds = early_stopping_rounds)]
+        if deadline is not None:
+            callbacks.append(TimeBudget(deadline = deadline))
+        booster = xgb.train(params = booster_params,
+                            dtrain = dfit,
+                            num_boost_round = n_estimators,
+                            evals = [(dval, "validation")],
+                            callbacks = callbacks,
+                            verbose_eval = False)
+        best_iteration = int(getattr(booster, "best_iteration", booster.num_boosted_rounds() - 1))
+        y_prob = booster.predict(dval, iteration_range = (0, best_iteration + 1))
+        score = metrics.classification_metrics(y_true = y_val, y_pred = y_prob > 0.5)["f1_score"]
+        return {"params": params,
+                "n_estimators": n_estimators,
+                "best_iteration": best_iteration,
+                "f1_score": float(score),
+                "fit_time": time.perf_counter() - start_time}
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def successive_halving_search(train_path: str, target_path: str, n_candidates: int, n_workers: int,
+                              min_rounds: int, max_rounds: int, search_dir: str, halving_factor: int = 3,
+                              early_stopping_rounds: int = 10, validation_size: float = 0.2,
+                              time_budget = None, base_params = None, rebalancing_strategy: str = "none",
+                              rebalancing_n_jobs = None, random_state = None):
+    """
+    DESCRIPTION:
+        This function searches the hyperparameters of XGBoost by successive
+        halving. A stratified validation fold is held out of the train
+        dataset before resampling, so it only holds real rows, and the fit
+        fold is rebalanced once with the rebalancing strategy. Both folds are
+        written to `search_dir`, where the workers memory-map them. Every rung
+        fits the surviving candidates in parallel on a process pool, with
+        `halving_factor` times more boosting rounds than the previous rung,
+        and keeps the best 1/`halving_factor` of them by F1-score on the
+        validation fold. Every worker gets an equal share of the cores as
+        `n_jobs`, so cores are not oversubscribed. Fits stop once `time_budget`
+        seconds have elapsed, and no rung is started after that.
+    ====================================================================================
+    PARAMETERS:
+        train_path: location of the transformed input features before resampling in .npy format
+        target_path: location of the encoded target column before resampling in .npy format
+        n_candidates: number of configurations of the first rung
+        n_workers: number of worker processes
+        min_rounds: boosting rounds of the first rung
+        max_rounds: maximum boosting rounds of a rung
+        search_dir: directory of the fit and validation folds
+        halving_factor: ratio of candidates dropped and of rounds added per rung
+        early_stopping_rounds: rounds without improvement on the validation fold before a fit stops
+        validation_size: share of the train dataset held out as validation fold
+        time_budget: seconds after which fits are stopped and no rung is started, None for no limit
+        base_params: hyperparameters shared by all the candidates, e.g. scale_pos_weight
+        rebalancing_strategy: strategy applied to the fit fold, see src.rebalancing
+        rebalancing_n_jobs: number of cores of the neighbour searches of the resampling
+        random_state: seed of the sampling, the folds, the resampling and the models
+    ====================================================================================
+    RETURN:
+        Tuple: best trial and search trace, i.e. the list of all trials
+    """
+    try:
+        start_time = time.perf_counter()
+        deadline = time.time() + time_budget if time_budget is not None else None
+        X = np.load(train_path, mmap_mode="r")
+        y = np.load(target_path, mmap_mode="r")
+        fit_index, val_index = train_test_split(np.arange(len(y)),
+                                                test_size = validation_size,
+                                                stratify = y,
+                                                random_state = random_state)
+        #The folds are materialized once here instead of once per candidate in the workers
+        fold_paths = {name: os.path.join(search_dir, f"{name}.npy") for name in ("fit", "fit_target", "val", "val_target")}
+        X_fit, y_fit = rebalancing.rebalance(X = X[fit_index],
+                                             y = y[fit_index],
+                                             strategy = rebalancing_strategy,
+                                             n_jobs = rebalancing_n_jobs,
+                                             random_state = random_state)
+        utils.save_numpy_array_data(file_path = fold_paths["fit"], array = X_fit)
+        utils.save_numpy_array_data(file_path = fold_paths["fit_target"], array = y_fit)
+        utils.save_numpy_array_data(file_path = fold_paths["val"], array = X[val_index])
+        utils.save_numpy_array_data(file_path = fold_paths["val_target"], array = y[val_index])
+        X_fit = y_fit = None
+
+        n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+        candidates = sample_candidates(n_candidates = n_candidates, random_state = random_state)
+        n_estimators = min_rounds
+        trace, best_trial = [], None
+
+        with ProcessPoolExecutor(max_workers = n_workers) as executor:
+            for rung in itertools.count():
+                logging.info(f"Rung {rung}: fitting {len(candidates)} candidates for at most {n_estimators} rounds "
+                             f"with {n_workers} workers of {n_jobs} threads.")
+                futures = [executor.submit(fit_candidate, fold_paths["fit"], fold_paths["fit_target"],
+                                           fold_paths["val"], fold_paths["val_target"],
+                                           params, base_params or dict(), n_estimators, n_jobs,
+                                           early_stopping_rounds, deadline, random_state)
+                           for params in candidates]
+                trials = [dict(future.result(), rung = rung) for future in futures]
+                trace.extend(trials)
+                trials.sort(key = lambda trial: trial["f1_score"], reverse = True)
+                best_trial = trials[0]
+                logging.info(f"Rung {rung}: best F1-score on validation fold: {best_trial['f1_score']} with {best_trial['params']}")
+
+                if len(trials) == 1 or n_estimators >= max_rounds:
+                    break
+                if deadline is not None and time.time() > deadline:
+                    logging.info(f"Time budget of {time_budget} seconds spent, stopping the search.")
+                    break
+                candidates = [trial["params"] for trial in trials[:max(1, len(trials) // halving_factor)]]
+                n_estimators = min(n_estimators * halving_factor, max_rounds)
+
+        logging.info(f"Search of {len(trace)} trials took {time.perf_counter() - start_time:.3f} seconds.")
+        return best_trial, trace
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
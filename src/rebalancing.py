@@ -0,0 +1,152 @@
+#Importing required dependencies
+import sys
+import time
+import numpy as np
+from typing import Optional
+from sklearn.decomposition import PCA
+from sklearn.neighbors import NearestNeighbors
+from imblearn.combine import SMOTETomek
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import TomekLinks
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+
+
+#"smotetomek" resamples with exact neighbour searches, "smotetomek_approx" searches the SMOTE neighbours in a
+#low-dimensional projection, "class_weight" leaves the data as is and weights the positive class in the model
+REBALANCING_STRATEGIES = ("smotetomek", "smotetomek_approx", "class_weight", "none")
+
+#Number of neighbours of SMOTE and number of dimensions of the projection of the approximate strategy
+SMOTE_K_NEIGHBORS = 5
+PROJECTION_N_COMPONENTS = 16
+
+
+class ProjectedNearestNeighbors(NearestNeighbors):
+    """
+    DESCRIPTION:
+    Approximate nearest neighbours: the data is projected on its first
+    `n_components` principal components and the neighbours are searched
+    exactly in that space, where tree based searches stay efficient,
+    instead of across all the sensor features.
+    """
+
+    def __init__(self, n_neighbors: int = SMOTE_K_NEIGHBORS + 1, n_components: int = PROJECTION_N_COMPONENTS,
+                 random_state = None, n_jobs = None):
+        super().__init__(n_neighbors=n_neighbors, n_jobs=n_jobs)
+        self.n_components = n_components
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        n_components = min(self.n_components, X.shape[0], X.shape[1])
+        self.projection_ = PCA(n_components=n_components, random_state=self.random_state).fit(X)
+        return super().fit(self.projection_.transform(X))
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        if X is not None:
+            X = self.projection_.transform(X)
+        return super().kneighbors(X, n_neighbors=n_neighbors, return_distance=return_distance)
+
+
+def is_resampling(strategy: str) -> bool:
+    """
+    DESCRIPTION:
+        This function tells whether a rebalancing strategy resamples the
+        dataset, i.e. adds synthetic rows and removes Tomek links.
+    ====================================================================================
+    RETURN:
+        True for the resampling strategies
+    """
+    try:
+        if strategy not in REBALANCING_STRATEGIES:
+            raise Exception(f"Unknown rebalancing strategy: {strategy}, expected one of {REBALANCING_STRATEGIES}")
+        return strategy in ("smotetomek", "smotetomek_approx")
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_resampler(strategy: str, n_jobs: Optional[int] = None, random_state = None) -> Optional[SMOTETomek]:
+    """
+    DESCRIPTION:
+        This function returns the resampler of a rebalancing strategy, None
+        for the strategies that do not resample. The neighbour searches of
+        SMOTE and of the Tomek links run on `n_jobs` cores.
+    ====================================================================================
+    PARAMETERS:
+        strategy: one of REBALANCING_STRATEGIES
+        n_jobs: number of cores of the neighbour searches, -1 for all cores
+        random_state: seed of SMOTE
+    ====================================================================================
+    RETURN:
+        SMOTETomek instance or None
+    """
+    try:
+        if strategy not in REBALANCING_STRATEGIES:
+            raise Exception(f"Unknown rebalancing strategy: {strategy}, expected one of {REBALANCING_STRATEGIES}")
+        if strategy in ("class_weight", "none"):
+            return None
+        if strategy == "smotetomek_approx":
+            k_neighbors = ProjectedNearestNeighbors(n_neighbors=SMOTE_K_NEIGHBORS + 1, random_state=random_state, n_jobs=n_jobs)
+        else:
+            k_neighbors = NearestNeighbors(n_neighbors=SMOTE_K_NEIGHBORS + 1, n_jobs=n_jobs)
+        return SMOTETomek(smote=SMOTE(k_neighbors=k_neighbors, random_state=random_state),
+                          tomek=TomekLinks(n_jobs=n_jobs),
+                          random_state=random_state)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def rebalance(X: np.ndarray, y: np.ndarray, strategy: str, n_jobs: Optional[int] = None, random_state = None):
+    """
+    DESCRIPTION:
+        This function rebalances the classes of a dataset with the given
+        strategy and logs the time it took. The dtypes of X and y are kept.
+    ====================================================================================
+    PARAMETERS:
+        X: 2-D array of input features
+        y: array of encoded target
+        strategy: one of REBALANCING_STRATEGIES
+        n_jobs: number of cores of the neighbour searches, -1 for all cores
+        random_state: seed of the resampler
+    ====================================================================================
+    RETURN:
+        Tuple: rebalanced X and y
+    """
+    try:
+        resampler = get_resampler(strategy=strategy, n_jobs=n_jobs, random_state=random_state)
+        if resampler is None:
+            logging.info(f"Rebalancing strategy: {strategy}, the dataset is not resampled.")
+            return X, y
+        logging.info(f"Before rebalancing with {strategy} shape of || Input: {X.shape} Target: {y.shape}")
+        start_time = time.perf_counter()
+        X_resampled, y_resampled = resampler.fit_resample(X, y)
+        logging.info(f"After rebalancing with {strategy} shape of || Input: {X_resampled.shape} Target: {y_resampled.shape}")
+        logging.info(f"Rebalancing with {strategy} took {time.perf_counter() - start_time:.3f} seconds.")
+        return X_resampled.astype(X.dtype, copy=False), y_resampled.astype(y.dtype, copy=False)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_scale_pos_weight(y: np.ndarray) -> float:
+    """
+    DESCRIPTION:
+        This function returns the weight of the positive class that balances
+        it with the negative class, i.e. the ratio of negative to positive
+        labels, as used by XGBoost's `scale_pos_weight`.
+    ====================================================================================
+    RETURN:
+        Ratio of negative to positive labels, 1.0 without positive labels
+    """
+    try:
+        counts = np.bincount(np.asarray(y, dtype=np.int64), minlength=2)
+        return float(counts[0] / counts[1]) if counts[1] > 0 else 1.0
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
@@ -0,0 +1,255 @@
+#Importing required dependencies
+import sys
+import numpy as np
+import pandas as pd
+from typing import Iterable
+from scipy.stats import kstwo
+#=========================================================================================
+from src.logger import logging
+from src.exception import APSException
+
+
+#Number of items a level of the sketch holds before it is compacted
+SKETCH_SIZE = 2048
+
+
+class QuantileSketch:
+    """
+    DESCRIPTION:
+    Mergeable KLL-style quantile sketch of one column. Values enter level 0
+    with weight 1. A level holding `k` or more items is compacted: it is
+    sorted and every other item, starting at a random offset, is promoted to
+    the next level with twice the weight. The total weight stays equal to
+    the number of values, and memory is bounded by `k` items per level, i.e.
+    O(k log(n/k)). NaNs are only counted.
+
+    ERROR BOUND:
+    A compaction at level h shifts the rank of any value by at most 2^h. The
+    sketch adds up these shifts, so for every x the sketched CDF satisfies
+    |F_sketch(x) - F(x)| <= get_error_bound() = sum of shifts / n, which is
+    at most (log2(n/k) + 1) / k in the worst case and ~sqrt(log2(n/k)) / k
+    with high probability thanks to the random offsets.
+    """
+
+    def __init__(self, k: int = SKETCH_SIZE, seed = None):
+        try:
+            self.k = k
+            self.levels = [np.empty(0)]
+            self.n = 0
+            self.n_null = 0
+            self.rank_error = 0
+            self.random = np.random.default_rng(seed)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def compress(self) -> None:
+        try:
+            h = 0
+            while h < len(self.levels):
+                level = self.levels[h]
+                if len(level) >= self.k:
+                    level = np.sort(level)
+                    #An odd item out stays on its level with its weight
+                    held_out = level[len(level) - len(level) % 2:]
+                    level = level[:len(level) - len(level) % 2]
+                    promoted = level[self.random.integers(2)::2]
+                    self.levels[h] = held_out
+                    if h + 1 == len(self.levels):
+                        self.levels.append(np.empty(0))
+                    self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                    self.rank_error += 2 ** h
+                h += 1
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def update(self, values: np.ndarray) -> None:
+        try:
+            values = np.asarray(values, dtype=np.float64)
+            is_null = np.isnan(values)
+            self.n_null += int(is_null.sum())
+            values = values[~is_null]
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.compress()
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        try:
+            while len(self.levels) < len(other.levels):
+                self.levels.append(np.empty(0))
+            for h, level in enumerate(other.levels):
+                self.levels[h] = np.concatenate([self.levels[h], level])
+            self.n += other.n
+            self.n_null += other.n_null
+            self.rank_error += other.rank_error
+            self.compress()
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def get_cdf_points(self):
+        """
+        Return the sorted values kept by the sketch and the cumulative
+        weight up to and including each of them.
+        """
+        try:
+            values = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)])
+            order = np.argsort(values, kind="stable")
+            return values[order], np.cumsum(weights[order])
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def get_quantiles(self, quantiles) -> np.ndarray:
+        """
+        Return the smallest values whose sketched CDF reaches each of the
+        given quantiles, NaN if the sketch is empty. The rank of every
+        returned value is within get_error_bound() of the exact one.
+        """
+        try:
+            quantiles = np.asarray(quantiles, dtype=np.float64)
+            if self.n == 0:
+                return np.full(quantiles.shape, np.nan)
+            values, cum_weights = self.get_cdf_points()
+            ranks = np.searchsorted(cum_weights, quantiles * self.n, side="left")
+            return values[np.clip(ranks, 0, len(values) - 1)]
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def get_error_bound(self) -> float:
+        return self.rank_error / self.n if self.n > 0 else 0.0
+
+
+def weighted_ks_statistic(values_a: np.ndarray, cum_weights_a: np.ndarray,
+                          values_b: np.ndarray, cum_weights_b: np.ndarray) -> float:
+    """
+    DESCRIPTION:
+        This function computes the KS statistic between two weighted empirical
+        CDFs given as sorted values and cumulative weights. Both CDFs are step
+        functions changing only at their own values, so evaluating them on the
+        union of the values gives the exact supremum of their difference.
+    ====================================================================================
+    RETURN:
+        KS statistic, NaN if either CDF is empty
+    """
+    try:
+        if len(values_a) == 0 or len(values_b) == 0:
+            return np.nan
+        grid = np.concatenate([values_a, values_b])
+        cdf_a = np.concatenate([[0], cum_weights_a])[np.searchsorted(values_a, grid, side="right")] / cum_weights_a[-1]
+        cdf_b = np.concatenate([[0], cum_weights_b])[np.searchsorted(values_b, grid, side="right")] / cum_weights_b[-1]
+        return float(np.max(np.abs(cdf_a - cdf_b)))
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def ks_2samp_sketch(base_values: np.ndarray, sketch: QuantileSketch):
+    """
+    DESCRIPTION:
+        This function runs an approximate two-sided KS test between the exact
+        sorted non-NaN values of a base column and the sketch of a current
+        column. The statistic is within sketch.get_error_bound() of the exact
+        one, and the p-value is the asymptotic one of scipy's ks_2samp
+        evaluated at the approximate statistic.
+    ====================================================================================
+    PARAMETERS:
+        base_values: sorted non-NaN values of the base column
+        sketch: QuantileSketch of the current column
+    ====================================================================================
+    RETURN:
+        Tuple: KS statistic, p-value and error bound of the statistic
+    """
+    try:
+        #A column without values on either side has no distribution to compare: insufficient data
+        if len(base_values) == 0 or sketch.n == 0:
+            return np.nan, np.nan, sketch.get_error_bound()
+        values, cum_weights = sketch.get_cdf_points()
+        statistic = weighted_ks_statistic(base_values, np.arange(1, len(base_values) + 1),
+                                          values, cum_weights)
+        m, n = sorted([float(len(base_values)), float(sketch.n)], reverse=True)
+        pvalue = float(np.clip(kstwo.sf(statistic, np.round(m * n / (m + n))), 0, 1))
+        return statistic, pvalue, sketch.get_error_bound()
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+class SketchedDataset:
+    """
+    DESCRIPTION:
+    Bounded-memory summary of a dataset read chunk by chunk: the column list,
+    the number of rows, the number of missing values of every column and a
+    QuantileSketch of every numeric column.
+    """
+
+    def __init__(self, k: int = SKETCH_SIZE):
+        try:
+            self.k = k
+            self.columns = None
+            self.n_rows = 0
+            self.null_count = dict()
+            self.sketches = dict()
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def update(self, df: pd.DataFrame) -> None:
+        try:
+            if self.columns is None:
+                self.columns = list(df.columns)
+                self.null_count = {column: 0 for column in self.columns}
+                self.sketches = {column: QuantileSketch(k=self.k, seed=i)
+                                 for i, column in enumerate(df.select_dtypes(include="number").columns)}
+            self.n_rows += df.shape[0]
+            for column, null_count in df.isna().sum().items():
+                self.null_count[column] += int(null_count)
+            for column, sketch in self.sketches.items():
+                sketch.update(df[column].to_numpy(dtype=np.float64))
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def get_null_fraction(self) -> pd.Series:
+        return pd.Series(self.null_count, dtype=np.float64) / max(self.n_rows, 1)
+
+
+def sketch_dataframe_chunks(chunks: Iterable[pd.DataFrame], k: int = SKETCH_SIZE) -> SketchedDataset:
+    """
+    DESCRIPTION:
+        This function builds a SketchedDataset from an iterable of DataFrame
+        chunks, so that only one chunk is held in memory at a time.
+    ====================================================================================
+    PARAMETERS:
+        chunks: iterable of pandas DataFrames with the same columns
+        k: size of the quantile sketches
+    ====================================================================================
+    RETURN:
+        SketchedDataset of all the chunks
+    """
+    try:
+        sketched_dataset = SketchedDataset(k=k)
+        for chunk in chunks:
+            sketched_dataset.update(chunk)
+        logging.info(f"Sketched {sketched_dataset.n_rows} rows of {len(sketched_dataset.columns or [])} columns.")
+        return sketched_dataset
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
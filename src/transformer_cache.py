@@ -0,0 +1,125 @@
+#Importing required dependencies
+import os, sys
+import shutil
+import hashlib
+#=======================================================
+from src.logger import logging
+from src.exception import APSException
+from src.artifact_store import artifact_store
+
+
+class TransformerCache:
+    """
+    DESCRIPTION:
+    On disk cache of the outputs of the data transformation stage: the
+    fitted transformer, the fitted target encoder and the transformed
+    arrays. An entry is a directory named after the key, the key being
+    the hash of the training input and of the parameters of every
+    fitted object. At most `max_entries` entries are kept, the least
+    recently used entry being evicted first.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int):
+        try:
+            self.cache_dir = cache_dir
+            self.max_entries = max_entries
+            os.makedirs(self.cache_dir, exist_ok= True)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    @staticmethod
+    def get_key(*parts) -> str:
+        """
+        DESCRIPTION:
+        Return the sha256 digest of the given parts, e.g. the hashes of
+        the input files and the repr of the objects to be fitted.
+        ================================================================
+        RETURN:
+        str: The cache key.
+        """
+        try:
+            sha256 = hashlib.sha256()
+            for part in parts:
+                sha256.update(str(part).encode())
+                sha256.update(b"\0")
+            return sha256.hexdigest()
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def get_entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+
+    def load(self, key: str, file_paths: dict) -> bool:
+        """
+        DESCRIPTION:
+        Link the files of the entry `key` to the given paths, `file_paths`
+        mapping the name of every file of the entry to its destination.
+        A hit marks the entry as the most recently used one.
+        ================================================================
+        RETURN:
+        bool: True on a hit, False if the entry is not cached.
+        """
+        try:
+            entry_dir = self.get_entry_dir(key)
+            if not all(os.path.exists(os.path.join(entry_dir, name)) for name in file_paths):
+                logging.info(f"Transformer cache miss: {key}")
+                return False
+
+            logging.info(f"Transformer cache hit: {key}")
+            for name, file_path in file_paths.items():
+                artifact_store.link(os.path.join(entry_dir, name), file_path)
+            os.utime(entry_dir)
+            return True
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def store(self, key: str, file_paths: dict) -> None:
+        """
+        DESCRIPTION:
+        Add the given files to the cache under `key`. The entry is built
+        in a temporary directory and renamed, so a partially written
+        entry is never read. The least recently used entries are then
+        evicted to keep at most `max_entries` entries.
+        ================================================================
+        RETURN: None
+        """
+        try:
+            entry_dir = self.get_entry_dir(key)
+            if os.path.exists(entry_dir):
+                return
+
+            temp_entry_dir = f"{entry_dir}.tmp"
+            shutil.rmtree(temp_entry_dir, ignore_errors= True)
+            for name, file_path in file_paths.items():
+                artifact_store.link(file_path, os.path.join(temp_entry_dir, name))
+            os.rename(temp_entry_dir, entry_dir)
+            logging.info(f"Transformer cache entry stored: {key}")
+            self.evict()
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+    def evict(self) -> None:
+        try:
+            entry_dirs = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                          if not name.endswith(".tmp")]
+            entry_dirs.sort(key=os.path.getmtime, reverse=True)
+            for entry_dir in entry_dirs[self.max_entries:]:
+                logging.info(f"Evicting least recently used transformer cache entry: {entry_dir}")
+                shutil.rmtree(entry_dir, ignore_errors= True)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
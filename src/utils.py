@@ -2,12 +2,19 @@
 import pandas as pd
 import numpy as np
 import sys,os
+import re
 import yaml
 import dill
+import hashlib
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Iterator, Optional
 #=========================================================================================
 from src.logger import logging
 from src.exception import APSException
 from src.config import mongo_client
+from src.artifact_store import artifact_store
+from src.entity.config_entity import WATERMARK_FILE_NAME
 
 
 def get_collection_as_dataframe(database_name: str, collection_name: str) -> pd.DataFrame:
@@ -37,22 +44,432 @@ def get_collection_as_dataframe(database_name: str, collection_name: str) -> pd.
         raise APSException(e, sys)
     
 
-def convert_columns_float(df: pd.DataFrame, exclude_columns: list) -> pd.DataFrame:
+def get_collection_as_chunks(database_name: str, collection_name: str, batch_size: int, query: Optional[dict] = None, schema = None) -> Iterator[pd.DataFrame]:
     """
     DESCRIPTION:
-    This code converts all columns in a Pandas DataFrame df to the float data 
-    type, except for those listed in exclude_columns.
+        This function streams a MongoDB collection in batches of `batch_size`
+        documents and yields every batch as a pandas DataFrame. The `_id` field
+        is excluded by the projection, and the documents of a batch are written
+        straight into preallocated column buffers, so the full list of
+        documents is never held in memory. With a schema, feature values are
+        parsed directly into buffers of the schema's dtype and NA tokens become NaN.
+    ====================================================================================
+    PARAMETERS:
+        database_name: database name
+        collection_name: collection name
+        batch_size: number of documents per yielded DataFrame
+        query: optional MongoDB filter restricting the documents read
+        schema: optional schema of the collection, see src.config.SensorSchema
+    ====================================================================================
+    RETURN:
+        Iterator of pandas DataFrames, one per batch
+    """
+    try:
+        logging.info(f"Streaming data from database: {database_name} and collection: {collection_name} in batches of {batch_size}")
+        cursor = mongo_client[database_name][collection_name].find(query or {}, {"_id": 0}).batch_size(batch_size)
+        na_values = set(schema.na_values) if schema is not None else set()
+        columns, buffers, n_rows = None, None, 0
+
+        def to_dataframe(n_rows: int) -> pd.DataFrame:
+            data = {}
+            for column, buffer in buffers.items():
+                dtype = schema.get_dtype(column) if schema is not None else object
+                if isinstance(dtype, pd.CategoricalDtype):
+                    data[column] = pd.Categorical(buffer[:n_rows], dtype=dtype)
+                else:
+                    data[column] = buffer[:n_rows].copy()
+            return pd.DataFrame(data, columns=columns)
+
+        for document in cursor:
+            if columns is None:
+                columns = list(document.keys())
+                logging.info(f"Found columns: {columns}")
+                buffers = {}
+                for column in columns:
+                    dtype = schema.get_dtype(column) if schema is not None else object
+                    buffers[column] = np.empty(batch_size, dtype=object if isinstance(dtype, pd.CategoricalDtype) else dtype)
+            for column in columns:
+                value = document.get(column)
+                if schema is not None and (value is None or value in na_values):
+                    value = np.nan
+                buffers[column][n_rows] = value
+            n_rows += 1
+            if n_rows == batch_size:
+                yield to_dataframe(n_rows)
+                n_rows = 0
+        if n_rows > 0:
+            yield to_dataframe(n_rows)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_collection_max_id(database_name: str, collection_name: str):
+    """
+    DESCRIPTION:
+        This function returns the largest `_id` of a MongoDB collection. It is
+        used as the high-water mark of incremental ingestion.
+    ====================================================================================
+    PARAMETERS:
+        database_name: database name
+        collection_name: collection name
+    ====================================================================================
+    RETURN:
+        Largest `_id` of the collection, None if the collection is empty
+    """
+    try:
+        documents = list(mongo_client[database_name][collection_name].find({}, {"_id": 1}).sort("_id", -1).limit(1))
+        if len(documents) == 0:
+            return None
+        return documents[0]["_id"]
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_collection_id_ranges(database_name: str, collection_name: str, n_partitions: int) -> list:
+    """
+    DESCRIPTION:
+        This function splits a MongoDB collection into at most `n_partitions`
+        contiguous `_id` ranges of roughly equal size using the `$bucketAuto`
+        stage, and returns one MongoDB filter per range in ascending `_id` order.
+    ====================================================================================
+    PARAMETERS:
+        database_name: database name
+        collection_name: collection name
+        n_partitions: number of ranges
+    ====================================================================================
+    RETURN:
+        List of MongoDB filters, one per `_id` range
+    """
+    try:
+        buckets = list(mongo_client[database_name][collection_name].aggregate(
+            [{"$bucketAuto": {"groupBy": "$_id", "buckets": n_partitions}}],
+            allowDiskUse=True,
+        ))
+        queries = []
+        for i, bucket in enumerate(buckets):
+            #The upper bound of a bucket is exclusive except for the last one
+            upper_bound = "$lte" if i == len(buckets) - 1 else "$lt"
+            queries.append({"_id": {"$gte": bucket["_id"]["min"], upper_bound: bucket["_id"]["max"]}})
+        logging.info(f"Split collection: {collection_name} into {len(queries)} _id ranges")
+        return queries
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_committed_partitions(file_path: str) -> list:
+    """
+    DESCRIPTION:
+    This function lists the committed partitions of a partition directory:
+    the partitions of its watermark file, which is only replaced once a
+    partition is fully written. Without watermark, the complete partition
+    files, i.e. part-NNNNN.parquet or part-NNNNN.csv, in name order; the
+    temporary files of a partition being written are never listed.
+    ==========================================================================
+    PARAMETERS:
+    file_path: partition directory
+    ==========================================================================
+    RETURN: names of the committed partitions
+    """
+    try:
+        watermark_file_path = os.path.join(file_path, WATERMARK_FILE_NAME)
+        if os.path.exists(watermark_file_path):
+            with open(watermark_file_path, "r") as file_reader:
+                return list(yaml.safe_load(file_reader)["partitions"])
+        return sorted(name for name in os.listdir(file_path)
+                      if re.fullmatch(r"part-\d+\.(parquet|csv)", name))
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def load_feature_store(file_path: str, partitions: Optional[list] = None, columns: Optional[list] = None, schema = None) -> pd.DataFrame:
+    """
+    DESCRIPTION:
+    This function loads the feature store as a pandas DataFrame. The feature
+    store is either a single file or a directory of partitions, in which case
+    the given partitions (or every committed partition, see
+    get_committed_partitions) are concatenated.
+    ==========================================================================
+    PARAMETERS:
+    file_path: feature store file or partition directory
+    partitions: names of the partitions to be loaded from the directory
+    columns: names of the columns to be read, all columns if None
+    schema: optional schema applied to CSV files, see load_dataframe
+    ==========================================================================
+    RETURN: Pandas DataFrame of the feature store
+    """
+    try:
+        if not os.path.isdir(file_path):
+            return load_dataframe(file_path, columns=columns, schema=schema)
+        if partitions is None:
+            partitions = get_committed_partitions(file_path)
+        if len(partitions) == 0:
+            raise Exception(f"Feature store: {file_path} has no partitions")
+        return pd.concat([load_dataframe(os.path.join(file_path, partition), columns=columns, schema=schema) for partition in partitions],
+                         ignore_index=True)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def load_split(feature_store_file_path: str, split_file_path: str, subset: str, columns: Optional[list] = None, schema = None) -> pd.DataFrame:
+    """
+    DESCRIPTION:
+    This function materializes the train or test view of the feature store
+    from the persisted split. The split is a boolean mask over the rows of
+    the feature store (True for test rows) and is opened memory-mapped. The
+    feature store only grows by appending partitions, so the mask covers
+    its first rows.
+    ==========================================================================
+    PARAMETERS:
+    feature_store_file_path: feature store file or partition directory
+    split_file_path: location of the test mask in .npy format
+    subset: "train" or "test"
+    columns: names of the columns to be read, all columns if None
+    schema: optional schema applied to CSV files, see load_dataframe
+    ==========================================================================
+    RETURN: Pandas DataFrame of the requested subset
+    """
+    try:
+        if subset not in ("train", "test"):
+            raise Exception(f"Unknown subset: {subset}")
+        test_mask = np.load(split_file_path, mmap_mode="r")
+        df = load_feature_store(feature_store_file_path, columns=columns, schema=schema)
+        rows = np.flatnonzero(test_mask) if subset == "test" else np.flatnonzero(~test_mask)
+        return df.iloc[rows].reset_index(drop=True)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def iter_dataframe(file_path: str, batch_size: int, columns: Optional[list] = None, schema = None) -> Iterator[pd.DataFrame]:
+    """
+    DESCRIPTION:
+    This function reads a dataset artifact, or a directory of partitions,
+    in chunks of at most `batch_size` rows so that only one chunk is held
+    in memory at a time. Parquet files are read by record batch, CSV files
+    with the dtypes and NA tokens of the schema when one is given.
+    ==========================================================================
+    PARAMETERS:
+    file_path: dataset artifact or partition directory
+    batch_size: maximum number of rows per chunk
+    columns: names of the columns to be read, all columns if None
+    schema: optional schema applied to CSV files, see load_dataframe
+    ==========================================================================
+    RETURN: Iterator of pandas DataFrames
+    """
+    try:
+        if os.path.isdir(file_path):
+            for partition in get_committed_partitions(file_path):
+                yield from iter_dataframe(os.path.join(file_path, partition), batch_size, columns=columns, schema=schema)
+            return
+        if file_path.endswith(".parquet"):
+            for record_batch in pq.ParquetFile(file_path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns):
+                yield record_batch.to_pandas()
+            return
+        read_csv_kwargs = dict()
+        if schema is not None:
+            header = columns if columns is not None else list(pd.read_csv(file_path, nrows=0).columns)
+            read_csv_kwargs = dict(na_values=list(schema.na_values),
+                                   dtype={column: schema.get_dtype(column) for column in header})
+        yield from pd.read_csv(file_path, usecols=columns, chunksize=batch_size, **read_csv_kwargs)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def iter_split(feature_store_file_path: str, split_file_path: str, subset: str, batch_size: int,
+               columns: Optional[list] = None, schema = None, start_row: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    DESCRIPTION:
+    This function is the chunked counterpart of load_split. It reads the
+    feature store chunk by chunk and yields the rows of every chunk that
+    belong to the requested subset of the persisted split. Feature store
+    rows before `start_row`, e.g. the ones seen by an earlier run, are
+    skipped.
+    ==========================================================================
+    PARAMETERS:
+    feature_store_file_path: feature store file or partition directory
+    split_file_path: location of the test mask in .npy format
+    subset: "train" or "test"
+    batch_size: maximum number of feature store rows per chunk
+    columns: names of the columns to be read, all columns if None
+    schema: optional schema applied to CSV files, see load_dataframe
+    start_row: index of the first feature store row to be read
+    ==========================================================================
+    RETURN: Iterator of pandas DataFrames
+    """
+    try:
+        if subset not in ("train", "test"):
+            raise Exception(f"Unknown subset: {subset}")
+        test_mask = np.load(split_file_path, mmap_mode="r")
+        offset = 0
+        for chunk in iter_dataframe(feature_store_file_path, batch_size, columns=columns, schema=schema):
+            if offset >= len(test_mask):
+                break
+            if offset + chunk.shape[0] <= start_row:
+                offset += chunk.shape[0]
+                continue
+            skipped_rows = max(start_row - offset, 0)
+            chunk = chunk.iloc[skipped_rows:len(test_mask) - offset]
+            offset += skipped_rows
+            chunk_mask = np.asarray(test_mask[offset:offset + chunk.shape[0]])
+            offset += chunk.shape[0]
+            yield chunk[chunk_mask if subset == "test" else ~chunk_mask].reset_index(drop=True)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def load_dataframe(file_path: str, columns: Optional[list] = None, schema = None) -> pd.DataFrame:
+    """
+    DESCRIPTION:
+    This function loads a dataset artifact as a pandas DataFrame. The format
+    is taken from the file extension: `.parquet` files are read with pyarrow,
+    any other file is parsed as CSV. Only the given columns are read. Parquet
+    files keep the dtypes they were written with; CSV files are parsed
+    straight into the dtypes and NA tokens of the schema when one is given.
+    ==========================================================================
+    PARAMETERS:
+    file_path: location of the dataset artifact
+    columns: names of the columns to be read, all columns if None
+    schema: optional schema of the dataset, see src.config.SensorSchema
+    ==========================================================================
+    RETURN: Pandas DataFrame of the dataset
+    """
+    try:
+        if file_path.endswith(".parquet"):
+            return pd.read_parquet(file_path, columns=columns, memory_map=True)
+        if schema is None:
+            return pd.read_csv(file_path, usecols=columns)
+        header = columns if columns is not None else list(pd.read_csv(file_path, nrows=0).columns)
+        return pd.read_csv(file_path,
+                           usecols=columns,
+                           na_values=list(schema.na_values),
+                           dtype={column: schema.get_dtype(column) for column in header})
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def save_dataframe(file_path: str, df: pd.DataFrame) -> None:
+    """
+    DESCRIPTION:
+    This function saves a pandas DataFrame as a dataset artifact in the
+    format given by the file extension (`.parquet` or CSV), creating the
+    directory path if it doesn't exist. The file is written under a
+    temporary name and renamed, so a file that is a hardlink to the
+    artifact store is replaced instead of overwritten.
+    ==========================================================================
+    PARAMETERS:
+    file_path: location of the dataset artifact
+    df: Pandas DataFrame to be saved
+    ==========================================================================
+    RETURN: None
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_file_path = f"{file_path}.tmp"
+        if file_path.endswith(".parquet"):
+            df.to_parquet(temp_file_path, index=False)
+        else:
+            df.to_csv(path_or_buf=temp_file_path, index=False, header=True)
+        os.replace(temp_file_path, file_path)
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+class DataFrameWriter:
+    """
+    DESCRIPTION:
+    Appends pandas DataFrames chunk by chunk to a single dataset artifact in
+    the format given by the file extension. Parquet chunks are written as row
+    groups sharing the schema of the first chunk. The chunks are written to a
+    temporary file renamed over `file_path` once closed, so a file that is a
+    hardlink to the artifact store is replaced instead of overwritten.
+    """
+
+    def __init__(self, file_path: str):
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            self.file_path = file_path
+            self.temp_file_path = f"{file_path}.tmp"
+            self.parquet_writer = None
+            self.n_rows = 0
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def write(self, df: pd.DataFrame) -> None:
+        try:
+            if self.file_path.endswith(".parquet"):
+                if self.parquet_writer is None:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    self.parquet_writer = pq.ParquetWriter(self.temp_file_path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(df, schema=self.parquet_writer.schema, preserve_index=False)
+                self.parquet_writer.write_table(table)
+            else:
+                df.to_csv(path_or_buf=self.temp_file_path,
+                          mode="w" if self.n_rows == 0 else "a",
+                          index=False,
+                          header=self.n_rows == 0,)
+            self.n_rows += df.shape[0]
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def close(self) -> None:
+        try:
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+            if os.path.exists(self.temp_file_path):
+                os.replace(self.temp_file_path, self.file_path)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
+def apply_schema(df: pd.DataFrame, schema) -> pd.DataFrame:
+    """
+    DESCRIPTION:
+    This function converts every column of a Pandas DataFrame df to the
+    dtype declared by the schema, turning the schema's NA tokens into NaN.
+    Columns already of the declared dtype are left untouched.
     ==========================================================================
     PARAMETERS:
     df: pandas.DataFrame
-    exclude_columns: Columns needed to be excluded
+    schema: schema of the dataset, see src.config.SensorSchema
     ==========================================================================
-    RETURN: Pandas DataFrame with columns of float data type.
+    RETURN: Pandas DataFrame with columns of the declared dtypes.
     """
     try:
         for column in df.columns:
-            if column not in exclude_columns:
-                df[column]=df[column].astype('float')
+            dtype = schema.get_dtype(column)
+            if df[column].dtype == dtype:
+                continue
+            series = df[column]
+            #Strings are of object dtype, or of the str dtype from pandas 3 on
+            if series.dtype == object or pd.api.types.is_string_dtype(series):
+                series = series.mask(series.isin(schema.na_values))
+            df[column] = series.astype(dtype)
         return df
     
     except Exception as e:
@@ -60,6 +477,65 @@ def convert_columns_float(df: pd.DataFrame, exclude_columns: list) -> pd.DataFra
         raise APSException(e, sys)
     
 
+def get_file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    DESCRIPTION:
+    This function computes the sha256 digest of a file, reading it in blocks
+    of `block_size` bytes.
+    ==========================================================================
+    PARAMETERS:
+    file_path: location of the file
+    block_size: number of bytes read at once
+    ==========================================================================
+    RETURN: sha256 digest of the file in hexadecimal format.
+    """
+    try:
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for block in iter(lambda: file_obj.read(block_size), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
+def get_dataset_hash(file_path: str) -> str:
+    """
+    DESCRIPTION:
+    This function computes the sha256 digest of a dataset artifact. A
+    directory of partitions with a watermark file is hashed from the
+    watermark alone: committed partitions are never rewritten, so the high-
+    water mark, the partition names and the row count identify the dataset
+    without reading it. Without watermark, it is hashed from the names and
+    digests of its committed partitions. Either way, appending a partition
+    changes the digest.
+    ==========================================================================
+    PARAMETERS:
+    file_path: dataset file or partition directory
+    ==========================================================================
+    RETURN: sha256 digest of the dataset in hexadecimal format.
+    """
+    try:
+        if not os.path.isdir(file_path):
+            return get_file_hash(file_path)
+        sha256 = hashlib.sha256()
+        watermark_file_path = os.path.join(file_path, WATERMARK_FILE_NAME)
+        if os.path.exists(watermark_file_path):
+            with open(watermark_file_path, "r") as file_reader:
+                watermark = yaml.safe_load(file_reader)
+            sha256.update(yaml.safe_dump(watermark, sort_keys=True).encode())
+            return sha256.hexdigest()
+        for partition in get_committed_partitions(file_path):
+            sha256.update(f"{partition}:{get_file_hash(os.path.join(file_path, partition))}".encode())
+        return sha256.hexdigest()
+
+    except Exception as e:
+        logging.error(APSException(e, sys))
+        raise APSException(e, sys)
+
+
 def write_yaml_file(file_path, data: dict) -> None:
     """
     DESCRIPTION:
@@ -73,45 +549,60 @@ def write_yaml_file(file_path, data: dict) -> None:
     RETURN: YAML file containing the report.
     """
     try:
-        file_dir = os.path.dirname(file_path)
-        os.makedirs(file_dir,exist_ok=True)
-        with open(file_path,"w") as file_writer:
-            yaml.dump(data,file_writer)
+        artifact_store.save_bytes(file_path, yaml.dump(data).encode())
     
     except Exception as e:
         logging.error(APSException(e, sys))
         raise APSException(e, sys)
     
 
-def save_numpy_array_data(file_path: str, array: np.array) -> None:
+def read_yaml_file(file_path) -> dict:
     """
-    DESCRIPTION
-    This function will write the data in NumPy.array form and 
-    save it as an object file in the directory by creating a 
-    directory path if it doesn't exist.
-    =============================================================
-    PARAMETERS
-    file_path: Directory to save the file
-    array: Format of dataset
-    =============================================================
-    RETURN: None
+    DESCRIPTION:
+    This function will read a YAML file and return its content.
+    ==========================================================================
+    PARAMETERS:
+    file_path: the path of the YAML file to be read
+    ==========================================================================
+    RETURN: dictionary containing the content of the YAML file.
     """
     try:
-        dir_path = os.path.dirname(file_path)
-        os.makedirs(dir_path, exist_ok=True)
-        with open(file_path, "wb") as file_obj:
-            np.save(file_obj, array)
+        with open(file_path,"r") as file_reader:
+            return yaml.safe_load(file_reader)
 
     except Exception as e:
         logging.error(APSException(e, sys))
         raise APSException(e, sys)
-    
 
-def save_object(file_path: str, obj: object) -> None:
+
+class HashingWriter:
     """
     DESCRIPTION:
-    This function takes in a file path and an object as input, 
-    and saves the object to the file specified by the file path.
+    File-like sink computing the sha256 digest of the bytes written to it,
+    e.g. by numpy.save, without keeping them.
+    """
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        return len(data)
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
+def save_numpy_array_data(file_path: str, array: np.array) -> None:
+    """
+    DESCRIPTION
+    This function will write the data in NumPy.array form and 
+    save it as an object file in the directory by creating a 
+    directory path if it doesn't exist. The .npy bytes of the 
+    array are hashed first, without being written, so an array 
+    identical to one of an earlier run is linked from the 
+    artifact store instead of written. The digest is the one 
+    of the .npy file, as for the files of NumpyArrayWriter.
     =============================================================
     PARAMETERS
     file_path: Directory to save the file
@@ -120,27 +611,42 @@ def save_object(file_path: str, obj: object) -> None:
     RETURN: None
     """
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok= True)
-        with open(file_path, "wb") as file_obj:
-            dill.dump(obj, file_obj)
+        array = np.ascontiguousarray(array)
+        hashing_writer = HashingWriter()
+        np.save(hashing_writer, array)
+        def write(path):
+            with open(path, "wb") as file_obj:
+                np.save(file_obj, array)
+        artifact_store.save(file_path, hashing_writer.hexdigest(), write)
 
     except Exception as e:
         logging.error(APSException(e, sys))
         raise APSException(e, sys)
     
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     DESCRIPTION:
     This function will load numpy array data from the file 
-    path and return a NumPy.array
+    path and return a NumPy.array. With `mmap_mode` the file
+    is memory-mapped instead of read, so the array is read
+    zero-copy from the page cache as it is accessed.
     =======================================================
     PARAMETERS:
     file_path: location of file to be loaded in str format
+    mmap_mode: None, "r" or "c", see numpy.load. Writable
+    memory maps ("r+", "w+") are rejected: artifacts are
+    hardlinks to the artifact store, so writes would change
+    the stored content shared with other runs. "c" gives a
+    writable copy-on-write view instead.
     =======================================================
     RETURN: NumPy.array
     """
     try:
+        if mmap_mode in ("r+", "w+"):
+            raise Exception(f"Writable memory map: {mmap_mode} of artifact: {file_path}, use \"c\" for copy-on-write")
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
         
@@ -149,6 +655,55 @@ def load_numpy_array_data(file_path: str) -> np.array:
         raise APSException(e, sys)    
     
 
+class NumpyArrayWriter:
+    """
+    DESCRIPTION:
+    Writes an array of `n_rows` rows chunk by chunk into a .npy file
+    that is memory-mapped, so the whole array is never held in memory.
+    The file is allocated on the first chunk with its dtype and the shape
+    of its rows, and handed to the artifact store once it is closed.
+    """
+
+    def __init__(self, file_path: str, n_rows: int):
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            self.file_path = file_path
+            self.n_rows = n_rows
+            self.array = None
+            self.offset = 0
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def write(self, array: np.ndarray) -> None:
+        try:
+            if self.array is None:
+                self.array = np.lib.format.open_memmap(f"{self.file_path}.tmp", mode="w+", dtype=array.dtype,
+                                                       shape=(self.n_rows, *array.shape[1:]))
+            self.array[self.offset:self.offset + array.shape[0]] = array
+            self.offset += array.shape[0]
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+    def close(self) -> None:
+        try:
+            if self.offset != self.n_rows:
+                raise Exception(f"{self.offset} rows written to: {self.file_path}, expected {self.n_rows}")
+            if self.array is None:
+                return
+            self.array.flush()
+            self.array = None
+            os.replace(f"{self.file_path}.tmp", self.file_path)
+            artifact_store.save_file(self.file_path)
+
+        except Exception as e:
+            logging.error(APSException(e, sys))
+            raise APSException(e, sys)
+
+
 def save_object(file_path: str, obj: object):
     """
     DESCRIPTION:
@@ -162,9 +717,7 @@ def save_object(file_path: str, obj: object):
     RETURN: None
     """
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok= True)
-        with open(file_path, "wb") as file_obj:
-            dill.dump(obj, file_obj)
+        artifact_store.save_bytes(file_path, dill.dumps(obj))
         logging.info("Object saved")
         
     except Exception as e:
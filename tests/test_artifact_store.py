@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pytest
+from src import utils
+from src.artifact_store import artifact_store
+from src.exception import APSException
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "store_dir", str(tmp_path / "artifact_store"))
+    monkeypatch.setattr(artifact_store, "enabled", True)
+    return tmp_path
+
+
+def test_array_saved_at_once_and_in_chunks_is_stored_once(store_dir):
+    array = np.arange(12, dtype=np.float32).reshape(4, 3)
+    saved_path = str(store_dir / "saved" / "train.npy")
+    written_path = str(store_dir / "written" / "train.npy")
+    utils.save_numpy_array_data(file_path=saved_path, array=array)
+    writer = utils.NumpyArrayWriter(file_path=written_path, n_rows=4)
+    writer.write(array[:2])
+    writer.write(array[2:])
+    writer.close()
+
+    assert os.stat(saved_path).st_ino == os.stat(written_path).st_ino
+    assert utils.get_file_hash(saved_path) == utils.get_file_hash(written_path)
+    np.testing.assert_array_equal(utils.load_numpy_array_data(written_path), array)
+
+
+def test_prune_removes_only_unreferenced_contents(store_dir):
+    kept_path = str(store_dir / "run_1" / "kept.npy")
+    deleted_path = str(store_dir / "run_2" / "deleted.npy")
+    utils.save_numpy_array_data(file_path=kept_path, array=np.zeros(3))
+    utils.save_numpy_array_data(file_path=deleted_path, array=np.ones(3))
+    os.remove(deleted_path)
+
+    assert artifact_store.prune() > 0
+    stored_files = [file_name for _, _, file_names in os.walk(artifact_store.store_dir) for file_name in file_names]
+    assert stored_files == [os.path.basename(artifact_store.get_content_path(utils.get_file_hash(kept_path)))]
+    assert artifact_store.prune() == 0
+
+
+@pytest.mark.parametrize("mmap_mode", ["r+", "w+"])
+def test_writable_memory_map_is_rejected(store_dir, mmap_mode):
+    file_path = str(store_dir / "run" / "array.npy")
+    utils.save_numpy_array_data(file_path=file_path, array=np.zeros(3))
+    with pytest.raises(APSException):
+        utils.load_numpy_array_data(file_path=file_path, mmap_mode=mmap_mode)
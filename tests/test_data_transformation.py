@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import RobustScaler
+from src import utils
+from src.config import TARGET_COLUMN
+from src.components.data_transformation import DataTransformation
+
+
+@pytest.fixture
+def train_df():
+    random = np.random.RandomState(0)
+    n_rows = 20000
+    df = pd.DataFrame({"aa_000": random.lognormal(size=n_rows),
+                       "ab_000": random.normal(loc=5, scale=3, size=n_rows),
+                       "ac_000": np.round(random.exponential(size=n_rows)),
+                       "ad_000": np.full(n_rows, 2.0)}).astype(np.float32)
+    df.loc[random.rand(n_rows) < 0.3, "ab_000"] = np.nan
+    df[TARGET_COLUMN] = np.where(random.rand(n_rows) < 0.05, "pos", "neg")
+    return df
+
+
+def test_sketch_fitted_robust_scaler_matches_sklearn(train_df, monkeypatch):
+    batch_size = 1000
+    monkeypatch.setattr(utils, "iter_split", lambda **kwargs: (train_df.iloc[start:start + batch_size]
+                                                             for start in range(0, len(train_df), batch_size)))
+    data_transformation = DataTransformation.__new__(DataTransformation)
+    data_transformation.data_transformation_config = SimpleNamespace(batch_size=batch_size, sketch_size=256)
+    data_transformation.data_ingestion_artifact = SimpleNamespace(feature_store_file_path=None, split_file_path=None)
+
+    pipeline = data_transformation.fit_transformer_from_chunks(
+        transformation_pipeline=DataTransformation.get_data_transformer_object())
+    robust_scaler = pipeline.named_steps["RobustScaler"]
+
+    input_feature_arr = pipeline.named_steps["Imputer"].transform(train_df.drop(TARGET_COLUMN, axis=1))
+    exact_scaler = RobustScaler().fit(input_feature_arr)
+    #Every sketched quantile must lie between the exact quantiles at its rank plus or minus the error bound
+    error_bound = 2 * (np.log2(len(train_df) / 256) + 1) / 256
+    for j in range(input_feature_arr.shape[1]):
+        column = np.sort(input_feature_arr[:, j].astype(np.float64))
+        low, high = np.quantile(column, [max(0.5 - error_bound, 0), min(0.5 + error_bound, 1)])
+        assert low <= robust_scaler.center_[j] <= high
+        q1_low, q1_high = np.quantile(column, [0.25 - error_bound, 0.25 + error_bound])
+        q3_low, q3_high = np.quantile(column, [0.75 - error_bound, 0.75 + error_bound])
+        if exact_scaler.scale_[j] != 1.0:
+            assert q3_low - q1_high <= robust_scaler.scale_[j] <= q3_high - q1_low
+    #A constant column is neither shifted nor scaled, as in sklearn
+    assert robust_scaler.center_[3] == exact_scaler.center_[3] == 2.0
+    assert robust_scaler.scale_[3] == exact_scaler.scale_[3] == 1.0
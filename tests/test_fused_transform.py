@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from src.fused_transform import FusedTransformer
+from src.components.data_transformation import DataTransformation
+
+
+@pytest.fixture
+def fitted_pipeline():
+    random = np.random.RandomState(0)
+    n_rows = 5000
+    df = pd.DataFrame(random.lognormal(size=(n_rows, 20)).astype(np.float32),
+                      columns=[f"f{j:02d}_000" for j in range(20)])
+    df = df.mask(random.rand(n_rows, 20) < 0.2)
+    df["f19_000"] = np.full(n_rows, 3.0, dtype=np.float32)
+    return DataTransformation.get_data_transformer_object().fit(df), df
+
+
+def test_fused_transformer_matches_pipeline(fitted_pipeline):
+    pipeline, df = fitted_pipeline
+    fused_transformer = FusedTransformer.from_pipeline(pipeline, dtype="float32")
+    expected = pipeline.transform(df).astype("float32", copy=False)
+
+    np.testing.assert_array_equal(fused_transformer.transform(df), expected)
+    #Columns are selected by name, whatever their order in the dataframe
+    np.testing.assert_array_equal(fused_transformer.transform(df[df.columns[::-1]]), expected)
+    #A smaller batch reuses the buffer and still matches
+    np.testing.assert_array_equal(fused_transformer.transform(df.iloc[:7]), expected[:7])
+    #Rows made only of missing values are imputed
+    all_missing = pd.DataFrame(np.nan, index=range(3), columns=df.columns, dtype=np.float32)
+    np.testing.assert_array_equal(fused_transformer.transform(all_missing),
+                                  pipeline.transform(all_missing).astype("float32", copy=False))
+
+
+@pytest.mark.parametrize("batch_size", [1, 10, 100, 1000, 10000])
+def test_fused_transformer_latency(fitted_pipeline, batch_size):
+    pipeline, df = fitted_pipeline
+    batch = pd.concat([df] * 2, ignore_index=True).iloc[:batch_size]
+    fused_transformer = FusedTransformer.from_pipeline(pipeline, dtype="float32")
+    n_repeats = max(10, 10000 // batch_size)
+
+    start_time = time.perf_counter()
+    for _ in range(n_repeats):
+        pipeline.transform(batch)
+    pipeline_latency = (time.perf_counter() - start_time) / n_repeats
+    start_time = time.perf_counter()
+    for _ in range(n_repeats):
+        fused_transformer.transform(batch)
+    fused_latency = (time.perf_counter() - start_time) / n_repeats
+
+    print(f"Batch of {batch_size} rows: pipeline {pipeline_latency * 1e6:.1f}us, fused {fused_latency * 1e6:.1f}us")
+    #Loose bound, the latencies are reported rather than asserted tightly
+    assert fused_latency < 2 * pipeline_latency
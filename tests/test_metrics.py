@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score
+from src import metrics
+
+
+def sklearn_metrics(y_true, y_pred):
+    tn, fp, fn, tp = confusion_matrix(y_true, y_pred, labels=[0, 1]).ravel()
+    return dict(tn=tn, fp=fp, fn=fn, tp=tp,
+                accuracy=accuracy_score(y_true, y_pred),
+                precision=precision_score(y_true, y_pred, zero_division=0),
+                recall=recall_score(y_true, y_pred, zero_division=0),
+                f1_score=f1_score(y_true, y_pred, zero_division=0),
+                cost=metrics.COST_FP * fp + metrics.COST_FN * fn)
+
+
+@pytest.fixture
+def predictions():
+    random = np.random.RandomState(0)
+    y_true = (random.rand(5000) < 0.05).astype(np.int8)
+    #Rounded probabilities, so many rows are tied
+    y_prob = np.round(np.clip(0.6 * y_true + random.normal(0.2, 0.2, size=5000), 0, 1), 2)
+    return y_true, y_prob
+
+
+def test_classification_metrics_matches_sklearn(predictions):
+    y_true, y_prob = predictions
+    for y_pred in (y_prob >= 0.5, np.zeros_like(y_true), np.ones_like(y_true)):
+        scores = metrics.classification_metrics(y_true=y_true, y_pred=y_pred)
+        for name, expected in sklearn_metrics(y_true, y_pred).items():
+            assert scores[name] == pytest.approx(expected), name
+
+
+def test_threshold_sweep_matches_sklearn_at_every_threshold(predictions):
+    y_true, y_prob = predictions
+    sweep = metrics.threshold_sweep(y_true=y_true, y_prob=y_prob)
+    assert sweep["thresholds"][0] == np.inf
+    assert len(sweep["thresholds"]) == len(np.unique(y_prob)) + 1
+    for index, threshold in enumerate(sweep["thresholds"]):
+        for name, expected in sklearn_metrics(y_true, y_prob >= threshold).items():
+            assert sweep[name][index] == pytest.approx(expected), (name, threshold)
+
+
+def test_best_threshold_has_the_lowest_cost(predictions):
+    y_true, y_prob = predictions
+    threshold, scores = metrics.get_best_threshold(y_true=y_true, y_prob=y_prob, metric="cost")
+    costs = [sklearn_metrics(y_true, y_prob >= candidate)["cost"] for candidate in np.r_[np.inf, np.unique(y_prob)]]
+    assert scores["cost"] == min(costs)
+    assert scores["cost"] == sklearn_metrics(y_true, y_prob >= threshold)["cost"]